@@ -4,11 +4,17 @@ Analyze the percentage of objects that have departed from the system over time.
 This tracks: (Initial Objects - Current Objects) / Initial Objects * 100
 """
 
+import matplotlib
+matplotlib.use('Agg')  # Figures are only saved, never shown
 import matplotlib.pyplot as plt
+import numpy as np
 import sys
 import os
 from datetime import datetime
 
+from analyze_snapshot import (check_sorted_times, decimate_indices, find_closest_indices,
+                              first_crossing, load_snapshot_columns)
+
 
 def parse_snapshot_for_departures(filepath):
     """
@@ -17,87 +23,128 @@ def parse_snapshot_for_departures(filepath):
     Columns:
     0: timestamp (in years)
     12: total objects in the system
+    
+    Returns numpy arrays; the columns are loaded in bulk by load_snapshot_columns.
     """
     
-    times = []
-    objects_in_system = []
-    objects_departed = []
-    departure_percentage = []
+    data = load_snapshot_columns(filepath, (0, 12))
     
-    initial_objects = None
+    times = data[:, 0]
+    check_sorted_times(times, filepath)
+    objects_in_system = data[:, 1].astype(np.int64)
     
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-        
-        # Skip header line
-        for line in lines[1:]:
-            line = line.strip()
-            if not line:
-                continue
-                
-            parts = line.split(',')
-            if len(parts) < 13:
-                continue
-            
-            try:
-                timestamp = float(parts[0])
-                total_objects = int(parts[12])
-                
-                # Set initial object count from first data point
-                if initial_objects is None and total_objects > 0:
-                    initial_objects = total_objects
-                
-                # Calculate departed objects
-                if initial_objects and initial_objects > 0:
-                    departed = initial_objects - total_objects
-                    departure_pct = (departed / initial_objects) * 100
-                else:
-                    departed = 0
-                    departure_pct = 0.0
-                
-                times.append(timestamp)
-                objects_in_system.append(total_objects)
-                objects_departed.append(departed)
-                departure_percentage.append(departure_pct)
-                
-            except (ValueError, IndexError) as e:
-                continue
+    # Set initial object count from first data point
+    populated = np.flatnonzero(objects_in_system > 0)
+    initial_objects = int(objects_in_system[populated[0]]) if populated.size else None
+    
+    # Calculate departed objects; rows before the first populated snapshot count as 0
+    objects_departed = np.zeros_like(objects_in_system)
+    departure_percentage = np.zeros(len(times))
+    if initial_objects:
+        start = populated[0]
+        objects_departed[start:] = initial_objects - objects_in_system[start:]
+        departure_percentage[start:] = objects_departed[start:] * (100.0 / initial_objects)
     
     return times, objects_in_system, objects_departed, departure_percentage, initial_objects
 
 
-def plot_departure_analysis(times, objects_in_system, objects_departed, 
-                           departure_percentage, initial_objects, filename):
-    """Create visualizations focused on object departures."""
+def create_departure_figure():
+    """
+    Create the departure figure with its static labels and styling.
     
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+    Returns (fig, (ax1, ax2, ax3)). The bottom-right quadrant has no axes;
+    the summary table is drawn there as figure text. The same figure can be passed to
+    plot_departure_analysis for several files, so the axes, ticks and spines
+    are only built once per batch.
+    """
     
-    snapshot_name = os.path.basename(filename).replace('.txt', '')
-    fig.suptitle(f'Objects Departed from System Over Time\n{snapshot_name}', 
-                 fontsize=16, fontweight='bold', y=0.98)
+    # Constrained layout is solved at draw time, replacing tight_layout + bbox 'tight'
+    fig = plt.figure(figsize=(16, 12), constrained_layout=True)
+    gs = fig.add_gridspec(2, 2)
+    ax1 = fig.add_subplot(gs[0, 0])
+    ax2 = fig.add_subplot(gs[0, 1])
+    ax3 = fig.add_subplot(gs[1, 0])
     
-    # Plot 1: Departure Percentage - THE MAIN METRIC
-    ax1.plot(times, departure_percentage, color='#e74c3c', linewidth=3, alpha=0.9)
-    ax1.fill_between(times, 0, departure_percentage, alpha=0.3, color='#e74c3c')
     ax1.set_xlabel('Time (years)', fontsize=13, fontweight='bold')
     ax1.set_ylabel('Objects No Longer in System (%)', fontsize=13, fontweight='bold')
     ax1.set_title('Percentage of Objects Departed from System', fontsize=14, fontweight='bold')
     ax1.grid(True, alpha=0.3, linewidth=1.5)
-    ax1.set_xlim(0, max(times) if times else 10)
     ax1.set_ylim(0, 105)
     
+    ax2.set_xlabel('Time (years)', fontsize=12)
+    ax2.set_ylabel('Percentage (%)', fontsize=12)
+    ax2.set_title('System Status: Remaining vs Departed', fontsize=13, fontweight='bold')
+    ax2.set_ylim(0, 100)
+    ax2.grid(True, alpha=0.3, axis='y')
+    
+    ax3.set_xlabel('Time (years)', fontsize=12)
+    ax3.set_ylabel('Object Count', fontsize=12)
+    ax3.set_title('Absolute Object Counts', fontsize=13, fontweight='bold')
+    ax3.grid(True, alpha=0.3)
+    
+    return fig, (ax1, ax2, ax3)
+
+
+def clear_departure_figure(fig, axes):
+    """Remove the per-file lines, fills, texts and legends from the figure."""
+    
+    for text in fig.texts:
+        if text.get_gid() == 'departure_summary':
+            text.remove()
+    for ax in axes:
+        for artist in list(ax.lines) + list(ax.collections) + list(ax.texts):
+            artist.remove()
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+
+
+def plot_departure_analysis(times, objects_in_system, objects_departed, 
+                           departure_percentage, initial_objects, filename, figure=None,
+                           quick=False, full_resolution=False):
+    """
+    Create visualizations focused on object departures.
+    
+    figure is an optional (fig, axes) pair from create_departure_figure();
+    its data is replaced and the figure is left open for the next file.
+    Without it a new figure is created and closed after saving.
+    
+    quick saves at 150 DPI instead of 300 DPI (for batch previews).
+    
+    Long series are plotted from an evenly strided subset of at most
+    MAX_PLOT_POINTS snapshots unless full_resolution is set; milestones and
+    the summary table always use the full data.
+    """
+    
+    own_figure = figure is None
+    if own_figure:
+        figure = create_departure_figure()
+    fig, (ax1, ax2, ax3) = figure
+    clear_departure_figure(fig, (ax1, ax2, ax3))
+    
+    snapshot_name = os.path.basename(filename).replace('.txt', '')
+    fig.suptitle(f'Objects Departed from System Over Time\n{snapshot_name}', 
+                 fontsize=16, fontweight='bold')
+    
+    idx = slice(None) if full_resolution else decimate_indices(len(times))
+    t = times[idx]
+    
+    # Plot 1: Departure Percentage - THE MAIN METRIC
+    ax1.plot(t, departure_percentage[idx], color='#e74c3c', linewidth=3, alpha=0.9)
+    ax1.fill_between(t, 0, departure_percentage[idx], alpha=0.3, color='#e74c3c')
+    ax1.set_xlim(0, times.max() if len(times) else 10)
+    
     # Add milestone annotations
-    if times and departure_percentage:
-        milestones = [25, 50, 75, 90, 100]
-        for milestone in milestones:
-            # Find first time this milestone is reached
-            for i, pct in enumerate(departure_percentage):
-                if pct >= milestone:
-                    ax1.axhline(y=milestone, color='gray', linestyle='--', 
-                               linewidth=0.8, alpha=0.4)
-                    ax1.text(max(times) * 0.02, milestone + 2, f'{milestone}%', 
-                            fontsize=10, color='gray', fontweight='bold')
-                    break
+    if len(times) and len(departure_percentage):
+        milestones = np.array([25, 50, 75, 90, 100])
+        # Only mark milestones that are reached at some point
+        first = first_crossing(departure_percentage, milestones)
+        reached = milestones[first < len(departure_percentage)]
+        # All milestone lines go into one LineCollection spanning the x range
+        ax1.hlines(reached, 0, times.max(), colors='gray', linestyles='--',
+                   linewidth=0.8, alpha=0.4)
+        for milestone in reached:
+            ax1.text(times.max() * 0.02, milestone + 2, f'{milestone}%', 
+                    fontsize=10, color='gray', fontweight='bold')
         
         # Highlight final value
         final_pct = departure_percentage[-1]
@@ -112,47 +159,36 @@ def plot_departure_analysis(times, objects_in_system, objects_departed,
                     arrowprops=dict(arrowstyle='->', color='red', lw=2))
     
     # Plot 2: Objects Remaining vs Departed (Stacked to 100%)
-    remaining_pct = [100 - dp for dp in departure_percentage]
-    ax2.fill_between(times, 0, remaining_pct, alpha=0.7, color='#3498db', 
+    remaining_pct = 100.0 - departure_percentage[idx]
+    ax2.fill_between(t, 0, remaining_pct, alpha=0.7, color='#3498db', 
                      label='Still in System')
-    ax2.fill_between(times, remaining_pct, 100, alpha=0.7, color='#e74c3c', 
+    ax2.fill_between(t, remaining_pct, 100, alpha=0.7, color='#e74c3c', 
                      label='Departed')
-    ax2.set_xlabel('Time (years)', fontsize=12)
-    ax2.set_ylabel('Percentage (%)', fontsize=12)
-    ax2.set_title('System Status: Remaining vs Departed', fontsize=13, fontweight='bold')
     ax2.legend(loc='center left', fontsize=11, framealpha=0.9)
-    ax2.set_xlim(0, max(times) if times else 10)
-    ax2.set_ylim(0, 100)
-    ax2.grid(True, alpha=0.3, axis='y')
+    ax2.set_xlim(0, times.max() if len(times) else 10)
     
     # Plot 3: Absolute Counts
-    ax3.plot(times, objects_in_system, color='#3498db', linewidth=2.5, 
+    ax3.plot(t, objects_in_system[idx], color='#3498db', linewidth=2.5, 
              label='Objects in System', alpha=0.9)
-    ax3.plot(times, objects_departed, color='#e74c3c', linewidth=2.5, 
+    ax3.plot(t, objects_departed[idx], color='#e74c3c', linewidth=2.5, 
              label='Objects Departed', alpha=0.9)
     ax3.axhline(y=initial_objects, color='gray', linestyle='--', 
                linewidth=1.5, alpha=0.5, label=f'Initial: {initial_objects:,}')
-    ax3.set_xlabel('Time (years)', fontsize=12)
-    ax3.set_ylabel('Object Count', fontsize=12)
-    ax3.set_title('Absolute Object Counts', fontsize=13, fontweight='bold')
     ax3.legend(loc='best', fontsize=10)
-    ax3.grid(True, alpha=0.3)
-    ax3.set_xlim(0, max(times) if times else 10)
+    # Rescale the counts axis to this file only
+    ax3.relim()
+    ax3.autoscale_view()
+    ax3.set_xlim(0, times.max() if len(times) else 10)
     ax3.ticklabel_format(style='plain', axis='y')
     
     # Plot 4: Summary Statistics Table
-    ax4.axis('off')
-    
-    if times and departure_percentage:
+    if len(times) and len(departure_percentage):
         # Find key milestones
-        milestone_data = []
-        milestones = [10, 25, 50, 75, 90, 95, 99, 100]
-        
-        for milestone in milestones:
-            for i, pct in enumerate(departure_percentage):
-                if pct >= milestone:
-                    milestone_data.append((milestone, times[i], objects_departed[i]))
-                    break
+        milestones = np.array([10, 25, 50, 75, 90, 95, 99, 100])
+        milestone_idx = first_crossing(departure_percentage, milestones)
+        reached = milestone_idx < len(departure_percentage)
+        milestone_data = list(zip(milestones[reached], times[milestone_idx[reached]],
+                                  objects_departed[milestone_idx[reached]]))
         
         # Create summary text
         summary_lines = [
@@ -178,12 +214,11 @@ def plot_departure_analysis(times, objects_in_system, objects_departed,
         
         summary_text = '\n'.join(summary_lines)
         
-        ax4.text(0.1, 0.5, summary_text, fontsize=10, family='monospace',
-                verticalalignment='center',
-                bbox=dict(boxstyle='round', facecolor='lightyellow', 
-                         alpha=0.9, pad=1, edgecolor='orange', linewidth=2))
-    
-    plt.tight_layout()
+        # Placed in the empty bottom-right quadrant, in figure coordinates
+        fig.text(0.575, 0.25, summary_text, fontsize=10, family='monospace',
+                 verticalalignment='center', gid='departure_summary',
+                 bbox=dict(boxstyle='round', facecolor='lightyellow', 
+                          alpha=0.9, pad=1, edgecolor='orange', linewidth=2))
     
     # Save the figure
     output_dir = '/Users/stephanie/Documents/thesis/python_projects/output/object_loss_analysis'
@@ -193,9 +228,12 @@ def plot_departure_analysis(times, objects_in_system, objects_departed,
     output_filename = f'departure_analysis_{snapshot_name}_{timestamp}.png'
     output_path = os.path.join(output_dir, output_filename)
     
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    fig.savefig(output_path, dpi=150 if quick else 300)
     print(f"\n✓ Plot saved to: {output_path}")
     
+    if own_figure:
+        plt.close(fig)
+    
     return output_path
 
 
@@ -203,7 +241,7 @@ def print_departure_summary(times, objects_in_system, objects_departed,
                            departure_percentage, initial_objects):
     """Print summary focused on departures."""
     
-    if not times:
+    if len(times) == 0:
         print("No data to summarize")
         return
     
@@ -216,11 +254,8 @@ def print_departure_summary(times, objects_in_system, objects_departed,
     print(f"Number of Snapshots:       {len(times):,}")
     
     # Find when system is exhausted (100% departed)
-    exhaust_time = None
-    for i, pct in enumerate(departure_percentage):
-        if pct >= 100.0:
-            exhaust_time = times[i]
-            break
+    exhaust_idx = first_crossing(departure_percentage, [100.0])[0]
+    exhaust_time = times[exhaust_idx] if exhaust_idx < len(times) else None
     
     if exhaust_time:
         print(f"100% Departed at:          {exhaust_time:.2f} years")
@@ -230,15 +265,15 @@ def print_departure_summary(times, objects_in_system, objects_departed,
     print("-" * 70)
     
     # Print at key intervals
-    intervals = [0, 1, 2, 3, 5, 7.5, 10]
-    for target_time in intervals:
-        closest_idx = min(range(len(times)), key=lambda i: abs(times[i] - target_time))
-        if abs(times[closest_idx] - target_time) <= 0.5:
-            t = times[closest_idx]
-            in_sys = objects_in_system[closest_idx]
-            departed = objects_departed[closest_idx]
-            dep_pct = departure_percentage[closest_idx]
-            print(f"{t:>6.2f} {in_sys:>15,} {departed:>15,} {dep_pct:>11.2f}%")
+    intervals = np.array([0, 1, 2, 3, 5, 7.5, 10])
+    closest = find_closest_indices(times, intervals)
+    # Only report time points within 0.5 years of the target
+    for closest_idx in closest[np.abs(times[closest] - intervals) <= 0.5]:
+        t = times[closest_idx]
+        in_sys = objects_in_system[closest_idx]
+        departed = objects_departed[closest_idx]
+        dep_pct = departure_percentage[closest_idx]
+        print(f"{t:>6.2f} {in_sys:>15,} {departed:>15,} {dep_pct:>11.2f}%")
     
     # Final values
     print("-" * 70)
@@ -255,36 +290,48 @@ def print_departure_summary(times, objects_in_system, objects_departed,
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python analyze_objects_departed.py <snapshot_file>")
+        print("Usage: python analyze_objects_departed.py <snapshot_file> [<snapshot_file> ...] [--quick] [--full-resolution]")
         print("\nExample:")
         print("  python analyze_objects_departed.py input/snaps/snaps_output_2_20260112_182628.txt")
         sys.exit(1)
     
-    filepath = sys.argv[1]
+    filepaths = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    # Batches default to quick 150 DPI previews
+    quick = '--quick' in sys.argv or len(filepaths) > 1
+    full_resolution = '--full-resolution' in sys.argv
     
-    if not os.path.exists(filepath):
-        print(f"Error: File not found: {filepath}")
-        sys.exit(1)
-    
-    print(f"Reading snapshot file: {filepath}")
+    for filepath in filepaths:
+        if not os.path.exists(filepath):
+            print(f"Error: File not found: {filepath}")
+            sys.exit(1)
     
-    times, objects_in_system, objects_departed, departure_percentage, initial_objects = \
-        parse_snapshot_for_departures(filepath)
-    
-    if not times:
-        print("Error: No valid data found in file")
-        sys.exit(1)
+    # One figure is reused for every file in the batch
+    figure = create_departure_figure()
     
-    print(f"✓ Successfully parsed {len(times)} data points")
-    
-    # Print summary
-    print_departure_summary(times, objects_in_system, objects_departed, 
-                           departure_percentage, initial_objects)
-    
-    # Create visualization
-    print("Creating visualization...")
-    output_path = plot_departure_analysis(times, objects_in_system, objects_departed,
-                                         departure_percentage, initial_objects, filepath)
+    for filepath in filepaths:
+        print(f"Reading snapshot file: {filepath}")
+        
+        times, objects_in_system, objects_departed, departure_percentage, initial_objects = \
+            parse_snapshot_for_departures(filepath)
+        
+        if len(times) == 0:
+            print("Error: No valid data found in file")
+            sys.exit(1)
+        
+        print(f"✓ Successfully parsed {len(times)} data points")
+        
+        # Print summary
+        print_departure_summary(times, objects_in_system, objects_departed, 
+                               departure_percentage, initial_objects)
+        
+        # Create visualization
+        print("Creating visualization...")
+        output_path = plot_departure_analysis(times, objects_in_system, objects_departed,
+                                             departure_percentage, initial_objects, filepath,
+                                             figure=figure, quick=quick,
+                                             full_resolution=full_resolution)
+    
+    plt.close(figure[0])
     
     print(f"\n{'='*70}")
     print("ANALYSIS COMPLETE!")
@@ -10,28 +10,43 @@ Analyze snaps_output_2 format to extract:
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
+import numpy as np
 import os
 from datetime import datetime
+from operator import itemgetter
+
+from analyze_snapshot import count_lines, decimate_indices
+
+# Header name of each column parse_snaps_file reads, by col_indices key
+SNAPS_COLUMNS = {
+    'timestamp': 'timestamp',
+    'objects_lost': 'objects_lost_since_last_snap',
+    'total_objects': 'total objects in the system',
+    'objects_in_cache': 'total objects in cache',
+    'tubes_wetted': 'tubes_wetted_percent',
+    'expired_reads': 'tubes_expired_by_reads_percent',
+    'expired_time': 'tubes_expired_by_time_percent'
+}
 
 def parse_snaps_file(filepath):
     """
     Parse the snaps output file and extract relevant metrics.
     
-    Returns dictionaries of lists containing the data.
+    Returns a dictionary of numpy arrays containing the data.
     """
     
     print(f"Reading file: {filepath}")
     
-    # Data storage
-    data = {
-        'timestamp': [],
-        'objects_lost_since_snap': [],
-        'total_objects_in_system': [],
-        'total_objects_in_cache': [],
-        'tubes_wetted_percent': [],
-        'tubes_expired_by_reads_percent': [],
-        'tubes_expired_by_time_percent': []
-    }
+    # Data keys and the header column each one is read from
+    fields = [
+        ('timestamp', 'timestamp'),
+        ('objects_lost_since_snap', 'objects_lost'),
+        ('total_objects_in_system', 'total_objects'),
+        ('total_objects_in_cache', 'objects_in_cache'),
+        ('tubes_wetted_percent', 'tubes_wetted'),
+        ('tubes_expired_by_reads_percent', 'expired_reads'),
+        ('tubes_expired_by_time_percent', 'expired_time')
+    ]
     
     with open(filepath, 'r') as f:
         # Read header
@@ -41,72 +56,87 @@ def parse_snaps_file(filepath):
         print(f"Columns found: {len(columns)}")
         print(f"First few columns: {columns[:5]}")
         
-        # Find column indices
-        col_indices = {}
-        for i, col in enumerate(columns):
-            if col == 'timestamp':
-                col_indices['timestamp'] = i
-            elif col == 'objects_lost_since_last_snap':
-                col_indices['objects_lost'] = i
-            elif col == 'total objects in the system':
-                col_indices['total_objects'] = i
-            elif col == 'total objects in cache':
-                col_indices['objects_in_cache'] = i
-            elif col == 'tubes_wetted_percent':
-                col_indices['tubes_wetted'] = i
-            elif col == 'tubes_expired_by_reads_percent':
-                col_indices['expired_reads'] = i
-            elif col == 'tubes_expired_by_time_percent':
-                col_indices['expired_time'] = i
+        # Find column indices by header name, independent of column order
+        header_index = {col: i for i, col in enumerate(columns)}
+        col_indices = {key: header_index[name] for key, name in SNAPS_COLUMNS.items()
+                       if name in header_index}
         
         print(f"Column indices: {col_indices}")
         
-        # Read data rows
+        usecols = [col_indices[col] for _, col in fields]
+        
+        try:
+            # Fast path: numpy's C reader continues from the header in the
+            # same pass, parsing only the needed columns
+            values = np.loadtxt(f, delimiter=',', usecols=usecols,
+                                dtype=np.float64, ndmin=2)
+        except ValueError:
+            values = None
+    
+    if values is None:
+        values = parse_snaps_rows(filepath, usecols)
+    
+    data = {key: values[:, n] for n, (key, _) in enumerate(fields)}
+    
+    print(f"Total rows parsed: {len(data['timestamp'])}")
+    return data
+
+def parse_snaps_rows(filepath, usecols):
+    """
+    Line-by-line parse of the data rows, reporting and skipping bad lines.
+    
+    Used when the file contains rows numpy cannot convert.
+    """
+    
+    # Size the output from a byte-level line count, then fill it in place
+    values = np.empty((count_lines(filepath), len(usecols)), dtype=np.float64)
+    n_rows = 0
+    
+    # Specialize to the columns in use: stop splitting after the last one
+    # and pull them all out with a single itemgetter call
+    max_split = max(usecols) + 1
+    pick = itemgetter(*usecols)
+    
+    with open(filepath, 'r') as f:
+        f.readline()  # Skip header
+        
         for line_num, line in enumerate(f, start=2):
-            line = line.strip()
-            if not line:
+            if not line.strip():
                 continue
-                
-            parts = [p.strip() for p in line.split(',')]
+            
+            # float() ignores the padding around each field, so no per-field strip
+            parts = line.split(',', max_split)
             
             try:
-                data['timestamp'].append(float(parts[col_indices['timestamp']]))
-                data['objects_lost_since_snap'].append(float(parts[col_indices['objects_lost']]))
-                data['total_objects_in_system'].append(float(parts[col_indices['total_objects']]))
-                data['total_objects_in_cache'].append(float(parts[col_indices['objects_in_cache']]))
-                data['tubes_wetted_percent'].append(float(parts[col_indices['tubes_wetted']]))
-                data['tubes_expired_by_reads_percent'].append(float(parts[col_indices['expired_reads']]))
-                data['tubes_expired_by_time_percent'].append(float(parts[col_indices['expired_time']]))
+                values[n_rows] = [float(p) for p in pick(parts)]
             except (ValueError, IndexError) as e:
                 print(f"Warning: Skipping line {line_num} due to parsing error: {e}")
                 continue
+            n_rows += 1
     
-    print(f"Total rows parsed: {len(data['timestamp'])}")
-    return data
+    return values[:n_rows]
 
 def calculate_metrics(data, total_objects):
     """
     Calculate derived metrics from the parsed data.
+    
+    Each metric is returned as a numpy array aligned with data['timestamp'].
     """
     
+    lost_since_snap = np.asarray(data['objects_lost_since_snap'], dtype=np.float64)
+    objects_in_cache = np.asarray(data['total_objects_in_cache'], dtype=np.float64)
+    expired_reads = np.asarray(data['tubes_expired_by_reads_percent'], dtype=np.float64)
+    expired_time = np.asarray(data['tubes_expired_by_time_percent'], dtype=np.float64)
+    
     # Calculate cumulative lost objects
-    cumulative_lost = []
-    total = 0
-    for lost in data['objects_lost_since_snap']:
-        total += lost
-        cumulative_lost.append(total)
+    cumulative_lost = np.cumsum(lost_since_snap)
     
     # Calculate percentages
-    lost_objects_percent = [(lost / total_objects) * 100 for lost in cumulative_lost]
-    objects_in_cache_percent = [(cache / total_objects) * 100 
-                                 for cache in data['total_objects_in_cache']]
+    lost_objects_percent = cumulative_lost / total_objects * 100
+    objects_in_cache_percent = objects_in_cache / total_objects * 100
     
     # Total expired tubes percentage
-    total_expired_tubes_percent = [
-        reads + time 
-        for reads, time in zip(data['tubes_expired_by_reads_percent'], 
-                               data['tubes_expired_by_time_percent'])
-    ]
+    total_expired_tubes_percent = expired_reads + expired_time
     
     return {
         'cumulative_lost': cumulative_lost,
@@ -115,7 +145,8 @@ def calculate_metrics(data, total_objects):
         'total_expired_tubes_percent': total_expired_tubes_percent
     }
 
-def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10):
+def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10, quick=False,
+                          full_resolution=False):
     """
     Analyze snaps output format 2
     
@@ -127,6 +158,10 @@ def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10
         Total number of objects in the system (default: 1,000,000)
     total_time_years : int
         Total simulation time in years (default: 10)
+    quick : bool
+        Save a 150 DPI preview instead of the 300 DPI figure (default: False)
+    full_resolution : bool
+        Plot every snapshot instead of at most MAX_PLOT_POINTS (default: False)
     """
     
     # Parse the file
@@ -144,13 +179,17 @@ def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10
     file_timestamp = filename.replace('snaps_output_2_', '').replace('.txt', '')
     
     # Create visualization
-    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12), constrained_layout=True)
     fig.suptitle(f'Snaps Analysis Over {total_time_years} Years\n{filename}', 
                  fontsize=16, fontweight='bold')
     
+    # Plot a strided subset of long series; the statistics use the full data
+    idx = slice(None) if full_resolution else decimate_indices(len(data['timestamp']))
+    t = data['timestamp'][idx]
+    
     # Plot 1: Lost Objects Percentage
     ax1 = axes[0, 0]
-    ax1.plot(data['timestamp'], metrics['lost_objects_percent'], linewidth=2, color='#d62728')
+    ax1.plot(t, metrics['lost_objects_percent'][idx], linewidth=2, color='#d62728')
     ax1.set_xlabel('Time (years)', fontsize=12)
     ax1.set_ylabel('Lost Objects (%)', fontsize=12)
     ax1.set_title('Lost Objects Over Time', fontsize=14, fontweight='bold')
@@ -165,7 +204,7 @@ def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10
     
     # Plot 2: Wet Tubes Percentage
     ax2 = axes[0, 1]
-    ax2.plot(data['timestamp'], data['tubes_wetted_percent'], linewidth=2, color='#1f77b4')
+    ax2.plot(t, data['tubes_wetted_percent'][idx], linewidth=2, color='#1f77b4')
     ax2.set_xlabel('Time (years)', fontsize=12)
     ax2.set_ylabel('Wet Tubes (%)', fontsize=12)
     ax2.set_title('Wet Tubes Over Time', fontsize=14, fontweight='bold')
@@ -173,15 +212,15 @@ def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10
     ax2.set_xlim(0, total_time_years)
     
     # Add statistics
-    avg_wet = sum(data['tubes_wetted_percent']) / len(data['tubes_wetted_percent'])
-    max_wet = max(data['tubes_wetted_percent'])
+    avg_wet = np.mean(data['tubes_wetted_percent'])
+    max_wet = np.max(data['tubes_wetted_percent'])
     ax2.text(0.98, 0.95, f'Avg: {avg_wet:.2f}%\nMax: {max_wet:.2f}%', 
              transform=ax2.transAxes, ha='right', va='top',
              bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
     
     # Plot 3: Objects in Cache Percentage
     ax3 = axes[1, 0]
-    ax3.plot(data['timestamp'], metrics['objects_in_cache_percent'], linewidth=2, color='#2ca02c')
+    ax3.plot(t, metrics['objects_in_cache_percent'][idx], linewidth=2, color='#2ca02c')
     ax3.set_xlabel('Time (years)', fontsize=12)
     ax3.set_ylabel('Objects in Cache (%)', fontsize=12)
     ax3.set_title('Objects in Cache Over Time', fontsize=14, fontweight='bold')
@@ -189,7 +228,7 @@ def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10
     ax3.set_xlim(0, total_time_years)
     
     # Add statistics
-    avg_cache = sum(metrics['objects_in_cache_percent']) / len(metrics['objects_in_cache_percent'])
+    avg_cache = np.mean(metrics['objects_in_cache_percent'])
     final_cache = metrics['objects_in_cache_percent'][-1]
     ax3.text(0.98, 0.95, f'Avg: {avg_cache:.2f}%\nFinal: {final_cache:.2f}%', 
              transform=ax3.transAxes, ha='right', va='top',
@@ -197,9 +236,9 @@ def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10
     
     # Plot 4: Expired Tubes Percentage
     ax4 = axes[1, 1]
-    ax4.plot(data['timestamp'], data['tubes_expired_by_time_percent'], linewidth=2, 
+    ax4.plot(t, data['tubes_expired_by_time_percent'][idx], linewidth=2, 
              label='Expired by Time', color='#9467bd', linestyle='--')
-    ax4.plot(data['timestamp'], metrics['total_expired_tubes_percent'], linewidth=2.5, 
+    ax4.plot(t, metrics['total_expired_tubes_percent'][idx], linewidth=2.5, 
              label='Total Expired', color='#8c564b')
     ax4.set_xlabel('Time (years)', fontsize=12)
     ax4.set_ylabel('Expired Tubes (%)', fontsize=12)
@@ -209,18 +248,16 @@ def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10
     ax4.set_xlim(0, total_time_years)
     
     # Add statistics
-    avg_expired = sum(metrics['total_expired_tubes_percent']) / len(metrics['total_expired_tubes_percent'])
-    max_expired = max(metrics['total_expired_tubes_percent'])
+    avg_expired = np.mean(metrics['total_expired_tubes_percent'])
+    max_expired = np.max(metrics['total_expired_tubes_percent'])
     ax4.text(0.98, 0.95, f'Avg Total: {avg_expired:.2f}%\nMax Total: {max_expired:.2f}%', 
              transform=ax4.transAxes, ha='right', va='top',
              bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
     
-    plt.tight_layout()
-    
     # Save the figure
     output_filename = f'snaps_analysis_{file_timestamp}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
     output_path = os.path.join(output_dir, output_filename)
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    fig.savefig(output_path, dpi=150 if quick else 300)
     print(f"\nPlot saved to: {output_path}")
     
     # Generate summary statistics
@@ -228,11 +265,11 @@ def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10
     print("SUMMARY STATISTICS")
     print("="*70)
     
-    avg_loss = sum(data['objects_lost_since_snap']) / len(data['objects_lost_since_snap'])
-    min_wet = min(data['tubes_wetted_percent'])
-    max_cache = max(metrics['objects_in_cache_percent'])
-    avg_expired_reads = sum(data['tubes_expired_by_reads_percent']) / len(data['tubes_expired_by_reads_percent'])
-    avg_expired_time = sum(data['tubes_expired_by_time_percent']) / len(data['tubes_expired_by_time_percent'])
+    avg_loss = np.mean(data['objects_lost_since_snap'])
+    min_wet = np.min(data['tubes_wetted_percent'])
+    max_cache = np.max(metrics['objects_in_cache_percent'])
+    avg_expired_reads = np.mean(data['tubes_expired_by_reads_percent'])
+    avg_expired_time = np.mean(data['tubes_expired_by_time_percent'])
     
     print(f"\n1. LOST OBJECTS:")
     print(f"   - Total lost objects: {metrics['cumulative_lost'][-1]:,.0f}")
@@ -268,16 +305,18 @@ def analyze_snaps_format2(input_file, total_objects=1000000, total_time_years=10
         f.write('objects_in_cache_percent,expired_tubes_by_reads_percent,')
         f.write('expired_tubes_by_time_percent,total_expired_tubes_percent\n')
         
-        # Write data rows
-        for i in range(len(data['timestamp'])):
-            f.write(f"{data['timestamp'][i]},")
-            f.write(f"{metrics['lost_objects_percent'][i]},")
-            f.write(f"{metrics['cumulative_lost'][i]},")
-            f.write(f"{data['tubes_wetted_percent'][i]},")
-            f.write(f"{metrics['objects_in_cache_percent'][i]},")
-            f.write(f"{data['tubes_expired_by_reads_percent'][i]},")
-            f.write(f"{data['tubes_expired_by_time_percent'][i]},")
-            f.write(f"{metrics['total_expired_tubes_percent'][i]}\n")
+        # Write data rows in one go; repr keeps the shortest round-trip digits
+        table = np.column_stack([
+            data['timestamp'],
+            metrics['lost_objects_percent'],
+            metrics['cumulative_lost'],
+            data['tubes_wetted_percent'],
+            metrics['objects_in_cache_percent'],
+            data['tubes_expired_by_reads_percent'],
+            data['tubes_expired_by_time_percent'],
+            metrics['total_expired_tubes_percent']
+        ])
+        f.writelines(','.join(map(repr, row)) + '\n' for row in table.tolist())
     
     print(f"Summary data saved to: {csv_path}")
     
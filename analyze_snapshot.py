@@ -0,0 +1,938 @@
+#!/usr/bin/env python3
+"""
+Object fate, loss and cache analysis for snapshot files.
+
+Parses a snapshot file once and produces both the complete object fate
+figure and the object loss figure from the same arrays. The single-figure
+scripts (analyze_complete_object_fate.py, analyze_object_loss_percentage.py,
+analyze_cache_percentage.py) are thin wrappers around this module.
+
+Several files or glob patterns may be given; they are analyzed in parallel,
+one worker process per file.
+"""
+
+import glob
+import sys
+import os
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property, partial
+
+
+# Columns read by batch_visualize_complete and batch_visualize_storage_metrics:
+# time, lost %, wet tubes %, exhausted tubes %, cache %, 2/1/0 replica %.
+# Both load this one set, so with SNAP_CACHE=1 they share a cache file.
+BATCH_METRICS_USECOLS = (0, 9, 12, 13, 14, 15, 16, 17)
+
+
+def load_snapshot_columns(filepath, usecols, skiprows=1):
+    """
+    Load the requested columns of a snapshot file into a 2D float array.
+    
+    With SNAP_CACHE=1 the parsed columns are kept next to the snapshot file in
+    a .npz named after usecols and skiprows (see snapshot_cache_path), so
+    scripts reading different columns of the same file each keep their own
+    cache. A cache is reused as long as it is newer than the snapshot file.
+    """
+    
+    use_cache = os.environ.get('SNAP_CACHE') == '1'
+    if use_cache:
+        data = load_cached_columns(filepath, usecols, skiprows)
+        if data is not None:
+            return data
+    
+    data = parse_snapshot_columns(filepath, usecols, skiprows)
+    
+    if use_cache:
+        save_cached_columns(filepath, data, usecols, skiprows)
+    
+    return data
+
+
+def snapshot_cache_path(filepath, usecols, skiprows=1):
+    """Return the cache path for these columns, e.g. <filepath>.0-9-13.s3.npz."""
+    
+    return f"{filepath}.{'-'.join(map(str, usecols))}.s{skiprows}.npz"
+
+
+def load_cached_columns(filepath, usecols, skiprows=1):
+    """Return the cached columns, or None if the cache is stale/missing."""
+    
+    cache_path = snapshot_cache_path(filepath, usecols, skiprows)
+    if (not os.path.exists(cache_path) or
+            os.path.getmtime(cache_path) < os.path.getmtime(filepath)):
+        return None
+    
+    with np.load(cache_path) as cached:
+        return cached['data']
+
+
+def save_cached_columns(filepath, data, usecols, skiprows=1):
+    """
+    Write parsed columns to their cache file.
+    
+    The archive is written to a temporary file in the same directory and then
+    renamed over the cache, so a concurrent reader never sees a partial file.
+    """
+    
+    cache_path = snapshot_cache_path(filepath, usecols, skiprows)
+    try:
+        fd, tmp_path = tempfile.mkstemp(suffix='.npz', dir=os.path.dirname(cache_path) or '.')
+    except OSError as e:
+        print(f"Warning: could not write snapshot cache: {e}")
+        return
+    
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, data=data)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: could not write snapshot cache: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def count_lines(filepath):
+    """
+    Upper bound on the number of lines in a file, for preallocating arrays.
+    
+    Counts newlines in raw 1 MiB byte chunks, so no line is decoded or split.
+    """
+    
+    n_lines = 1  # A last line without a trailing newline
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            n_lines += chunk.count(b'\n')
+    return n_lines
+
+
+def parse_snapshot_columns(filepath, usecols, skiprows=1):
+    """
+    Parse the requested columns of a snapshot file into a 2D float array.
+    
+    The fast path hands the whole file to numpy's C parser. If any row is
+    malformed, the file is parsed again by parse_snapshot_columns_tolerant.
+    """
+    
+    try:
+        return np.loadtxt(filepath, delimiter=',', skiprows=skiprows, usecols=usecols,
+                          dtype=np.float64, ndmin=2)
+    except ValueError:
+        return parse_snapshot_columns_tolerant(filepath, usecols, skiprows)
+
+
+def parse_snapshot_columns_tolerant(filepath, usecols, skiprows=1, min_fields=None):
+    """
+    Parse the requested columns of a snapshot file, skipping malformed rows.
+    
+    Rows with fewer than min_fields fields (by default, too short to hold
+    every column) are filtered out and the rest is handed to numpy's C
+    parser. Only if a field still does not convert does genfromtxt parse the
+    kept rows, turning bad values into NaN; rows containing NaN are then
+    dropped (matching the old skip-on-error behaviour).
+    """
+    
+    # A row has min_fields fields if it has at least min_fields - 1 commas
+    if min_fields is None:
+        min_fields = max(usecols) + 1
+    
+    def kept_rows(f):
+        return (line for line_num, line in enumerate(f)
+                if line_num >= skiprows and line.count(',') >= min_fields - 1)
+    
+    try:
+        with open(filepath, 'r') as f:
+            values = np.loadtxt(kept_rows(f), delimiter=',', usecols=usecols,
+                                dtype=np.float64, ndmin=2)
+    except ValueError:
+        with warnings.catch_warnings():
+            # Skipped lines are expected here; don't report each one
+            warnings.simplefilter('ignore')
+            with open(filepath, 'r') as f:
+                values = np.genfromtxt(kept_rows(f), delimiter=',', usecols=usecols,
+                                       dtype=np.float64, invalid_raise=False, ndmin=2)
+        values = values[~np.isnan(values).any(axis=1)]
+    
+    return values.reshape(-1, len(usecols))
+
+
+@dataclass
+class FateArrays:
+    """
+    Object fate series for one snapshot file, one numpy array per field.
+    
+    read_cache, read_tubes and lost are cumulative counts; remaining is the
+    number of objects still in the system at each snapshot. Derived series
+    are computed on first access.
+    """
+    
+    times: np.ndarray
+    read_cache: np.ndarray
+    read_tubes: np.ndarray
+    lost: np.ndarray
+    remaining: np.ndarray
+    initial_objects: int = None
+    
+    def __len__(self):
+        return len(self.times)
+    
+    def _percent(self, counts):
+        """Express counts as a percentage of the initial object count."""
+        if not self.initial_objects:
+            return np.empty(0, dtype=np.float32)
+        # float32 is plenty for plotting and 2-decimal summaries
+        return counts.astype(np.float32) * np.float32(100.0 / self.initial_objects)
+    
+    @cached_property
+    def read_total(self):
+        return self.read_cache + self.read_tubes
+    
+    @cached_property
+    def read_cache_pct(self):
+        return self._percent(self.read_cache)
+    
+    @cached_property
+    def read_tubes_pct(self):
+        return self._percent(self.read_tubes)
+    
+    @cached_property
+    def read_total_pct(self):
+        return self._percent(self.read_total)
+    
+    @cached_property
+    def loss_pct(self):
+        return self._percent(self.lost)
+    
+    @cached_property
+    def remaining_pct(self):
+        return self._percent(self.remaining)
+
+
+def parse_complete_snapshot_file(filepath):
+    """
+    Parse the snapshot file and track all object fates.
+    
+    Returns a FateArrays with cumulative read/lost counts per snapshot.
+    
+    Columns:
+    0: timestamp (in years)
+    1: objects_read_from_cache_since_last_snap
+    3: objects_read_from_tubes_since_last_snap  
+    10: objects_lost_since_last_snap
+    12: total objects in the system
+    """
+    
+    data = load_snapshot_columns(filepath, (0, 1, 3, 10, 12))
+    
+    times = data[:, 0]
+    check_sorted_times(times, filepath)
+    total_objects_in_system = data[:, 4].astype(np.int32)
+    
+    # Accumulate read-cache, read-tubes and lost counts in one pass
+    cumulative = np.cumsum(data[:, 1:4].astype(np.int64), axis=0)
+    
+    # Counts are stored as int32; the cumulative totals must fit, and so must
+    # the sums FateArrays derives from them (read_total, lost + read + remaining)
+    int32_max = np.iinfo(np.int32).max
+    read_total = cumulative[:, 0] + cumulative[:, 1]
+    accounted = cumulative[:, 2] + read_total + data[:, 4].astype(np.int64)
+    if len(data) and (np.abs(cumulative).max() > int32_max or
+                      np.abs(data[:, 4]).max() > int32_max or
+                      np.abs(read_total).max() > int32_max or
+                      np.abs(accounted).max() > int32_max):
+        raise ValueError(f"Object counts in {filepath} exceed the int32 range")
+    cumulative = cumulative.astype(np.int32)
+    
+    # Set initial object count from first data point
+    populated = total_objects_in_system[total_objects_in_system > 0]
+    initial_objects = int(populated[0]) if populated.size else None
+    
+    return FateArrays(times=times,
+                      read_cache=cumulative[:, 0],
+                      read_tubes=cumulative[:, 1],
+                      lost=cumulative[:, 2],
+                      remaining=total_objects_in_system,
+                      initial_objects=initial_objects)
+
+
+def parse_new_snapshot_file(filepath):
+    """
+    Parse the new snapshot file format and calculate loss percentage over time.
+
+    Returns (times, cumulative_lost, loss_percentages, total_objects_in_system,
+    initial_objects) taken from the same parse as parse_complete_snapshot_file.
+    """
+
+    fa = parse_complete_snapshot_file(filepath)
+    return fa.times, fa.lost, fa.loss_pct, fa.remaining, fa.initial_objects
+
+
+def parse_cache_percentage_file(filepath):
+    """
+    Parse a snapshot file with three header lines for the cache percentage.
+
+    Columns:
+    0: timestamp (in reads)
+    16: objects_in_cache_pct
+
+    Returns (time_in_years, cache_percentages).
+    """
+
+    data = load_snapshot_columns(filepath, (0, 16), skiprows=3)
+
+    # Convert time stamps from reads to years
+    # Snapshots every 365 reads, 500 reads per day
+    # years = time_stamp / (500 reads/day * 365 days/year)
+    time_in_years = data[:, 0] / (500 * 365)
+    return time_in_years, data[:, 1]
+
+
+MAX_PLOT_POINTS = 5000
+
+
+def decimate_indices(n_points, max_points=MAX_PLOT_POINTS):
+    """
+    Return indices of an evenly strided subset of at most ~max_points points.
+    
+    Long runs have far more snapshots than the figure has pixels, so plotting
+    every point only adds render time. The last point is always kept so the
+    lines end where the data does.
+    """
+    
+    if n_points <= max_points:
+        return np.arange(n_points)
+    
+    step = -(-n_points // max_points)
+    indices = np.arange(0, n_points, step)
+    if indices[-1] != n_points - 1:
+        indices = np.append(indices, n_points - 1)
+    return indices
+
+
+def add_line_collection(ax, x, series, colors, linewidths, labels, linestyles=None):
+    """
+    Draw several series sharing the same x values as a single LineCollection.
+    
+    One collection is one artist and one draw call, instead of one Line2D per
+    series. Series that are empty (e.g. percentages without an initial object
+    count) are skipped. Returns proxy handles for the legend.
+    """
+    
+    linestyles = linestyles or ['-'] * len(series)
+    keep = [i for i, y in enumerate(series) if len(y) == len(x) and len(x)]
+    
+    if keep:
+        segments = [np.column_stack([x, series[i]]) for i in keep]
+        ax.add_collection(LineCollection(segments,
+                                         colors=[colors[i] for i in keep],
+                                         linewidths=[linewidths[i] for i in keep],
+                                         linestyles=[linestyles[i] for i in keep],
+                                         alpha=0.8, rasterized=True))
+        ax.autoscale_view()
+    
+    return [Line2D([], [], color=colors[i], linewidth=linewidths[i],
+                   linestyle=linestyles[i], alpha=0.8, label=labels[i])
+            for i in keep]
+
+
+def save_palette_png(fig, output_path, dpi=150, colors=256):
+    """
+    Save fig as an 8-bit palette PNG instead of 24-bit RGB.
+
+    The plots use a handful of colors plus antialiasing, so quantizing the
+    rendered canvas to a palette keeps them visually the same at roughly half
+    the file size. Meant for visual-only outputs; use savefig for figures that
+    need exact colors.
+    """
+
+    from PIL import Image
+
+    fig.set_dpi(dpi)
+    fig.canvas.draw()
+    image = Image.fromarray(np.asarray(fig.canvas.buffer_rgba())).convert('RGB')
+    image = image.quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+    image.save(output_path, compress_level=1, dpi=(dpi, dpi))
+
+
+def plot_complete_fate_analysis(fa, filename, full_resolution=False, dpi=150):
+    """Create comprehensive visualization of object fates."""
+    
+    # Plot a strided subset of long series; the summary panel uses the full data
+    idx = slice(None) if full_resolution else decimate_indices(len(fa))
+    t = fa.times[idx]
+    
+    fig = plt.figure(figsize=(18, 12))
+    gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
+    
+    snapshot_name = os.path.basename(filename).replace('.txt', '')
+    fig.suptitle(f'Complete Object Fate Analysis Over Time\n{snapshot_name}', 
+                 fontsize=18, fontweight='bold', y=0.98)
+    
+    # Plot 1: Stacked Area Chart - Percentage Distribution
+    ax1 = fig.add_subplot(gs[0, :])
+    lost_or_read_pct = fa.loss_pct[idx] + fa.read_total_pct[idx]
+    ax1.fill_between(t, 0, fa.loss_pct[idx], alpha=0.7, color='#d62728', label='Lost (Data Loss)',
+                     rasterized=True)
+    ax1.fill_between(t, fa.loss_pct[idx], lost_or_read_pct, 
+                     alpha=0.7, color='#2ca02c', label='Read (Successfully Accessed)', rasterized=True)
+    ax1.fill_between(t, lost_or_read_pct, 100,
+                     alpha=0.7, color='#1f77b4', label='Remaining in System', rasterized=True)
+    
+    ax1.set_xlabel('Time (years)', fontsize=12)
+    ax1.set_ylabel('Percentage of Initial Objects (%)', fontsize=12)
+    ax1.set_title('Object Fate Distribution (100% Stacked)', fontsize=14, fontweight='bold')
+    ax1.set_xlim(0, fa.times.max() if len(fa) else 10)
+    ax1.set_ylim(0, 100)
+    ax1.legend(loc='upper right', fontsize=11)
+    ax1.grid(True, alpha=0.3, axis='y')
+    
+    # Plot 2: Loss vs Read Comparison
+    ax2 = fig.add_subplot(gs[1, 0])
+    ax2.plot(t, fa.loss_pct[idx], color='#d62728', linewidth=2.5, label='Lost %', alpha=0.8,
+             rasterized=True)
+    ax2.plot(t, fa.read_total_pct[idx], color='#2ca02c', linewidth=2.5, label='Read %', alpha=0.8,
+             rasterized=True)
+    ax2.set_xlabel('Time (years)', fontsize=11)
+    ax2.set_ylabel('Percentage (%)', fontsize=11)
+    ax2.set_title('Lost vs Successfully Read', fontsize=13, fontweight='bold')
+    ax2.legend(loc='best', fontsize=10)
+    ax2.grid(True, alpha=0.3)
+    ax2.set_xlim(0, fa.times.max() if len(fa) else 10)
+    
+    # Plot 3: Read Breakdown (Cache vs Tubes)
+    ax3 = fig.add_subplot(gs[1, 1])
+    read_handles = add_line_collection(ax3, t,
+                                       [fa.read_cache_pct[idx], fa.read_tubes_pct[idx],
+                                        fa.read_total_pct[idx]],
+                                       colors=['#ff7f0e', '#9467bd', '#2ca02c'],
+                                       linewidths=[2, 2, 2.5],
+                                       linestyles=['-', '-', '--'],
+                                       labels=['Read from Cache', 'Read from Tubes', 'Total Read'])
+    ax3.set_xlabel('Time (years)', fontsize=11)
+    ax3.set_ylabel('Percentage (%)', fontsize=11)
+    ax3.set_title('Read Operations Breakdown', fontsize=13, fontweight='bold')
+    ax3.legend(handles=read_handles, loc='best', fontsize=9)
+    ax3.grid(True, alpha=0.3)
+    ax3.set_xlim(0, fa.times.max() if len(fa) else 10)
+    
+    # Plot 4: Remaining Objects %
+    ax4 = fig.add_subplot(gs[1, 2])
+    ax4.plot(t, fa.remaining_pct[idx], color='#1f77b4', linewidth=2.5, alpha=0.8, rasterized=True)
+    ax4.fill_between(t, 0, fa.remaining_pct[idx], alpha=0.3, color='#1f77b4', rasterized=True)
+    ax4.set_xlabel('Time (years)', fontsize=11)
+    ax4.set_ylabel('Remaining (%)', fontsize=11)
+    ax4.set_title('Objects Still in System', fontsize=13, fontweight='bold')
+    ax4.grid(True, alpha=0.3)
+    ax4.set_xlim(0, fa.times.max() if len(fa) else 10)
+    ax4.set_ylim(0, 100)
+    
+    # Plot 5: Absolute Counts
+    ax5 = fig.add_subplot(gs[2, :2])
+    count_handles = add_line_collection(ax5, t,
+                                        [fa.lost[idx], fa.read_total[idx], fa.remaining[idx]],
+                                        colors=['#d62728', '#2ca02c', '#1f77b4'],
+                                        linewidths=[2, 2, 2],
+                                        labels=['Lost Objects', 'Read Objects', 'Remaining Objects'])
+    ax5.set_xlabel('Time (years)', fontsize=11)
+    ax5.set_ylabel('Object Count', fontsize=11)
+    ax5.set_title('Absolute Object Counts', fontsize=13, fontweight='bold')
+    ax5.legend(handles=count_handles, loc='best', fontsize=10)
+    ax5.grid(True, alpha=0.3)
+    ax5.set_xlim(0, fa.times.max() if len(fa) else 10)
+    ax5.ticklabel_format(style='plain', axis='y')
+    
+    # Plot 6: Summary Statistics
+    ax6 = fig.add_subplot(gs[2, 2])
+    ax6.axis('off')
+    
+    if len(fa) and len(fa.loss_pct) and len(fa.read_total_pct):
+        final_time = fa.times[-1]
+        final_loss_pct = fa.loss_pct[-1]
+        final_read_pct = fa.read_total_pct[-1]
+        final_remaining_pct = fa.remaining_pct[-1]
+        
+        final_lost_count = fa.lost[-1]
+        final_read_count = fa.read_total[-1]
+        final_remaining_count = fa.remaining[-1]
+        
+        # Calculate when system exhausted
+        exhausted = fa.remaining == 0
+        exhaust_time = f"{fa.times[exhausted.argmax()]:.2f} yrs" if exhausted.any() else "N/A"
+        
+        summary_text = f"""
+FINAL ACCOUNTING
+━━━━━━━━━━━━━━━━━━━━━━
+Initial: {fa.initial_objects:,}
+
+LOST (Data Loss):
+  {final_lost_count:,}
+  {final_loss_pct:.2f}%
+
+READ (Accessed):
+  {final_read_count:,}
+  {final_read_pct:.2f}%
+
+REMAINING:
+  {final_remaining_count:,}
+  {final_remaining_pct:.2f}%
+━━━━━━━━━━━━━━━━━━━━━━
+Total Accounted:
+  {final_lost_count + final_read_count + final_remaining_count:,}
+  {final_loss_pct + final_read_pct + final_remaining_pct:.2f}%
+
+System Exhausted:
+  {exhaust_time}
+        """
+        
+        ax6.text(0.05, 0.5, summary_text, fontsize=11, family='monospace',
+                verticalalignment='center',
+                bbox=dict(boxstyle='round', facecolor='lightyellow', alpha=0.8, pad=1))
+    
+    plt.tight_layout()
+    
+    # Save the figure
+    output_dir = '/Users/stephanie/Documents/thesis/python_projects/output/object_loss_analysis'
+    os.makedirs(output_dir, exist_ok=True)
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_filename = f'complete_fate_analysis_{snapshot_name}_{timestamp}.png'
+    output_path = os.path.join(output_dir, output_filename)
+    
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
+    print(f"\n✓ Plot saved to: {output_path}")
+    plt.close(fig)
+    
+    return output_path
+
+
+def find_closest_indices(times, targets):
+    """
+    Return the index of the snapshot closest to each target time.
+    
+    Relies on the timestamps being sorted, so each lookup is a binary search.
+    Ties resolve to the earlier snapshot.
+    """
+    
+    targets = np.asarray(targets, dtype=np.float64)
+    right = np.searchsorted(times, targets).clip(0, len(times) - 1)
+    left = (right - 1).clip(0)
+    closer_left = np.abs(times[left] - targets) <= np.abs(times[right] - targets)
+    return np.where(closer_left, left, right)
+
+
+def first_crossing(values, thresholds):
+    """
+    Index of the first element of values >= each threshold.
+    
+    Uses a binary search over the running maximum, so it also holds if values
+    dips. Thresholds that are never reached map to len(values).
+    """
+    
+    running_max = np.maximum.accumulate(values)
+    return np.searchsorted(running_max, thresholds, side='left')
+
+
+def check_sorted_times(times, filepath):
+    """
+    Raise ValueError unless the snapshot timestamps are non-decreasing.
+    
+    Every interval lookup is a binary search over the timestamps, so this is
+    checked once at parse time instead of scanning linearly per query.
+    """
+    
+    if np.any(np.diff(times) < 0):
+        raise ValueError(f"Timestamps in {filepath} are not in increasing order")
+
+
+# Row layout for the fate interval table: time, read cache/tubes/total, lost, remaining
+FATE_ROW_FORMAT = '{:>6.2f} {:>12,} {:>12,} {:>12,} {:>12,} {:>12,}'.format
+
+
+def print_detailed_summary(fa):
+    """Print detailed summary statistics."""
+    
+    if len(fa) == 0:
+        print("No data to summarize")
+        return
+    
+    print("\n" + "="*80)
+    print("COMPLETE OBJECT FATE ANALYSIS")
+    print("="*80)
+    
+    print(f"\nInitial Objects:           {fa.initial_objects:,}")
+    print(f"Time Period:               {fa.times[0]:.2f} - {fa.times[-1]:.2f} years")
+    print(f"Number of Snapshots:       {len(fa):,}")
+    
+    # Find when system exhausted
+    exhausted = fa.remaining == 0
+    if exhausted.any():
+        exhaust_idx = int(exhausted.argmax())
+        print(f"System Exhausted at:       {fa.times[exhaust_idx]:.2f} years (snapshot {exhaust_idx})")
+    
+    print(f"\n{'Time':>6} {'Read Cache':>12} {'Read Tubes':>12} {'Total Read':>12} "
+          f"{'Lost':>12} {'Remaining':>12}")
+    print(f"{'(yrs)':>6} {'Count':>12} {'Count':>12} {'Count':>12} "
+          f"{'Count':>12} {'Count':>12}")
+    print("-" * 80)
+    
+    # Print summary at key intervals
+    intervals = np.array([0, 1, 2, 3, 5, 7.5, 10])
+    closest = find_closest_indices(fa.times, intervals)
+    # Interval rows followed by the final snapshot
+    rows = np.append(closest[np.abs(fa.times[closest] - intervals) <= 0.5], len(fa) - 1)
+    columns = zip(fa.times[rows].tolist(), fa.read_cache[rows].tolist(),
+                  fa.read_tubes[rows].tolist(), fa.read_total[rows].tolist(),
+                  fa.lost[rows].tolist(), fa.remaining[rows].tolist())
+    lines = [FATE_ROW_FORMAT(*row) for row in columns]
+    # Final values
+    lines.insert(-1, "-" * 80)
+    sys.stdout.write("\n".join(lines) + "\n")
+    
+    print("\n" + "="*80)
+    print("FINAL ACCOUNTING (Percentage of Initial Objects)")
+    print("="*80)
+    print(f"\nObjects LOST (data loss):        {fa.lost[-1]:>12,}  ({fa.loss_pct[-1]:>6.2f}%)")
+    print(f"Objects READ (accessed):         {fa.read_total[-1]:>12,}  ({fa.read_total_pct[-1]:>6.2f}%)")
+    print(f"  - Read from Cache:             {fa.read_cache[-1]:>12,}  ({fa.read_cache_pct[-1]:>6.2f}%)")
+    print(f"  - Read from Tubes:             {fa.read_tubes[-1]:>12,}  ({fa.read_tubes_pct[-1]:>6.2f}%)")
+    print(f"Objects REMAINING:               {fa.remaining[-1]:>12,}  ({fa.remaining_pct[-1]:>6.2f}%)")
+    print("-" * 80)
+    total_accounted = fa.lost[-1] + fa.read_total[-1] + fa.remaining[-1]
+    total_pct = fa.loss_pct[-1] + fa.read_total_pct[-1] + fa.remaining_pct[-1]
+    print(f"TOTAL ACCOUNTED:                 {total_accounted:>12,}  ({total_pct:>6.2f}%)")
+    print("="*80 + "\n")
+
+
+def plot_loss_analysis(times, cumulative_lost, loss_percentages, total_objects, 
+                       initial_objects, filename, full_resolution=False, dpi=150):
+    """Create comprehensive plots showing object loss over time."""
+    
+    # Plot a strided subset of long series; the summary panel uses the full data
+    idx = slice(None) if full_resolution else decimate_indices(len(times))
+    t = times[idx]
+    
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+    
+    snapshot_name = os.path.basename(filename).replace('.txt', '')
+    fig.suptitle(f'Object Loss Analysis Over 10 Years\n{snapshot_name}', 
+                 fontsize=16, fontweight='bold')
+    
+    # Plot 1: Loss Percentage Over Time
+    ax1.plot(t, loss_percentages[idx], color='tab:red', linewidth=2, alpha=0.8, rasterized=True)
+    ax1.set_xlabel('Time (years)', fontsize=12)
+    ax1.set_ylabel('Lost Objects (%)', fontsize=12)
+    ax1.set_title('Percentage of Objects Lost Over Time', fontsize=13, fontweight='bold')
+    ax1.grid(True, alpha=0.3)
+    ax1.set_xlim(0, times.max() if len(times) else 10)
+    if len(loss_percentages):
+        ax1.set_ylim(0, loss_percentages.max() * 1.05)
+    
+    # Add final percentage annotation
+    if len(times) and len(loss_percentages):
+        final_loss = loss_percentages[-1]
+        ax1.annotate(f'Final: {final_loss:.2f}%', 
+                    xy=(times[-1], final_loss),
+                    xytext=(times[-1] * 0.7, final_loss * 0.9),
+                    fontsize=10, fontweight='bold',
+                    bbox=dict(boxstyle='round,pad=0.5', facecolor='yellow', alpha=0.7),
+                    arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0.3'))
+    
+    # Plot 2: Cumulative Lost Objects (absolute count)
+    ax2.plot(t, cumulative_lost[idx], color='tab:orange', linewidth=2, alpha=0.8, rasterized=True)
+    ax2.set_xlabel('Time (years)', fontsize=12)
+    ax2.set_ylabel('Cumulative Lost Objects (count)', fontsize=12)
+    ax2.set_title('Cumulative Number of Lost Objects', fontsize=13, fontweight='bold')
+    ax2.grid(True, alpha=0.3)
+    ax2.set_xlim(0, times.max() if len(times) else 10)
+    if len(cumulative_lost):
+        ax2.ticklabel_format(style='plain', axis='y')
+    
+    # Plot 3: Total Objects Remaining in System
+    ax3.plot(t, total_objects[idx], color='tab:green', linewidth=2, alpha=0.8, rasterized=True)
+    ax3.set_xlabel('Time (years)', fontsize=12)
+    ax3.set_ylabel('Total Objects in System', fontsize=12)
+    ax3.set_title('Total Objects Remaining in System', fontsize=13, fontweight='bold')
+    ax3.grid(True, alpha=0.3)
+    ax3.set_xlim(0, times.max() if len(times) else 10)
+    ax3.ticklabel_format(style='plain', axis='y')
+    
+    # Add horizontal line at initial count
+    if initial_objects:
+        ax3.axhline(y=initial_objects, color='gray', linestyle='--', 
+                   linewidth=1, alpha=0.5, label=f'Initial: {initial_objects:,}')
+        ax3.legend(loc='upper right')
+    
+    # Plot 4: Summary Statistics
+    ax4.axis('off')
+    
+    if len(times) and len(loss_percentages) and len(cumulative_lost) and len(total_objects):
+        final_time = times[-1]
+        final_loss_pct = loss_percentages[-1]
+        final_lost_count = cumulative_lost[-1]
+        final_remaining = total_objects[-1]
+        
+        # Calculate loss rate
+        if final_time > 0:
+            avg_loss_rate_per_year = final_lost_count / final_time
+        else:
+            avg_loss_rate_per_year = 0
+        
+        summary_text = f"""
+        SUMMARY STATISTICS
+        ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+        
+        Initial Objects:        {initial_objects:>15,}
+        
+        After {final_time:.1f} years:
+        
+        Total Lost:             {final_lost_count:>15,}
+        Loss Percentage:        {final_loss_pct:>14.2f}%
+        
+        Objects Remaining:      {final_remaining:>15,}
+        Remaining Percentage:   {100 - final_loss_pct:>14.2f}%
+        
+        Average Loss Rate:      {avg_loss_rate_per_year:>15,.0f} objects/year
+        
+        Data Points:            {len(times):>15,}
+        Time Range:             {times[0]:.2f} - {final_time:.2f} years
+        """
+        
+        ax4.text(0.1, 0.5, summary_text, fontsize=12, family='monospace',
+                verticalalignment='center',
+                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+    
+    plt.tight_layout()
+    
+    # Save the figure
+    output_dir = '/Users/stephanie/Documents/thesis/python_projects/output/object_loss_analysis'
+    os.makedirs(output_dir, exist_ok=True)
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_filename = f'loss_analysis_{snapshot_name}_{timestamp}.png'
+    output_path = os.path.join(output_dir, output_filename)
+    
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
+    print(f"\n✓ Plot saved to: {output_path}")
+    plt.close(fig)
+    
+    return output_path
+
+
+# Row layout for print_summary: time, lost, loss %, remaining
+SUMMARY_ROW_FORMAT = '{:<15.2f} {:<20,} {:<15.4f} {:<20,}'.format
+
+
+def print_summary(times, cumulative_lost, loss_percentages, total_objects, initial_objects):
+    """Print summary statistics to console."""
+    
+    if len(times) == 0 or len(loss_percentages) == 0:
+        print("No data to summarize")
+        return
+    
+    print("\n" + "="*60)
+    print("OBJECT LOSS ANALYSIS SUMMARY")
+    print("="*60)
+    
+    print(f"\nInitial Objects:           {initial_objects:,}")
+    print(f"Time Period:               {times[0]:.2f} - {times[-1]:.2f} years")
+    print(f"Number of Snapshots:       {len(times):,}")
+    
+    print(f"\n{'Time (years)':<15} {'Lost Objects':<20} {'Loss %':<15} {'Remaining':<20}")
+    print("-" * 70)
+    
+    # Print summary at key intervals
+    intervals = np.array([0, 1, 2, 5, 7.5, 10])
+    closest = find_closest_indices(times, intervals)
+    # Only report time points within 0.5 years of the target, then the final values
+    rows = np.append(closest[np.abs(times[closest] - intervals) <= 0.5], len(times) - 1)
+    columns = zip(times[rows].tolist(), cumulative_lost[rows].tolist(),
+                  loss_percentages[rows].tolist(), total_objects[rows].tolist())
+    lines = [SUMMARY_ROW_FORMAT(*row) for row in columns]
+    lines.insert(-1, "-" * 70)
+    sys.stdout.write("\n".join(lines) + "\n")
+    
+    final_time = times[-1]
+    final_lost = cumulative_lost[-1]
+    
+    # Calculate average loss rate
+    if final_time > 0:
+        avg_rate = final_lost / final_time
+        print(f"\nAverage Loss Rate:         {avg_rate:,.0f} objects/year")
+    
+    print("="*60 + "\n")
+
+
+# Backends that only render to files; plt.show() is a no-op on these
+NON_INTERACTIVE_BACKENDS = ('agg', 'cairo', 'pdf', 'pgf', 'ps', 'svg', 'template')
+
+
+def has_interactive_backend():
+    """True if the active matplotlib backend can open a figure window."""
+    
+    return matplotlib.get_backend().lower() not in NON_INTERACTIVE_BACKENDS
+
+
+def plot_cache_percentage(time_in_years, cache_percentages, output_file, dpi=300, show=False):
+    """Plot the percentage of objects in cache over time and save it."""
+
+    fig = plt.figure(figsize=(14, 8))
+    plt.plot(time_in_years, cache_percentages, linewidth=2, color='#2E86AB', rasterized=True)
+    plt.xlabel('Time (years)', fontsize=14, fontweight='bold')
+    plt.ylabel('Objects in Cache (%)', fontsize=14, fontweight='bold')
+    plt.title('Percentage of Objects in Cache Over Time\n(Snapshots every 365 reads, 500 reads/day)', 
+              fontsize=16, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3, linestyle='--')
+    plt.tight_layout()
+
+    # Add some statistics to the plot
+    avg_cache = np.mean(cache_percentages)
+    max_cache = np.max(cache_percentages)
+    final_cache = cache_percentages[-1] if len(cache_percentages) else 0
+
+    stats_text = f'Average: {avg_cache:.2f}%\nMax: {max_cache:.2f}%\nFinal: {final_cache:.2f}%'
+    plt.text(0.02, 0.98, stats_text, transform=plt.gca().transAxes, 
+             fontsize=12, verticalalignment='top',
+             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+
+    # Save the plot
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    plt.savefig(output_file, dpi=dpi, bbox_inches='tight')
+    print(f"Plot saved to: {output_file}")
+
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+def print_cache_summary(time_in_years, cache_percentages):
+    """Print cache percentage summary statistics to console."""
+
+    avg_cache = np.mean(cache_percentages)
+    max_cache = np.max(cache_percentages)
+    final_cache = cache_percentages[-1] if len(cache_percentages) else 0
+
+    print(f"\nSummary Statistics:")
+    print(f"Total snapshots: {len(time_in_years)}")
+    print(f"Time range: {time_in_years[0]:.2f} to {time_in_years[-1]:.2f} years")
+    print(f"Average cache percentage: {avg_cache:.2f}%")
+    print(f"Maximum cache percentage: {max_cache:.2f}%")
+    print(f"Minimum cache percentage: {np.min(cache_percentages):.4f}%")
+    print(f"Final cache percentage: {final_cache:.2f}%")
+
+
+def parse_cli_options(argv):
+    """
+    Split command-line arguments into (paths, full_resolution, dpi).
+
+    Screen previews default to 150 DPI; pass --dpi=300 for final figures.
+    """
+
+    paths = [arg for arg in argv if not arg.startswith('--')]
+    full_resolution = '--full-resolution' in argv
+    dpi = 150
+    for arg in argv:
+        if arg.startswith('--dpi='):
+            dpi = int(arg.split('=', 1)[1])
+    return paths, full_resolution, dpi
+
+
+def process_one(filepath, full_resolution=False, dpi=150):
+    """Parse one snapshot file, print its summaries and save both figures."""
+
+    if not os.path.exists(filepath):
+        print(f"Error: File not found: {filepath}")
+        return False
+
+    print(f"Reading snapshot file: {filepath}")
+
+    # Parse once; both analyses read from the same arrays
+    fa = parse_complete_snapshot_file(filepath)
+
+    if len(fa) == 0:
+        print(f"Error: No valid data found in file: {filepath}")
+        return False
+
+    print(f"✓ Successfully parsed {len(fa)} data points")
+
+    print_detailed_summary(fa)
+    print_summary(fa.times, fa.lost, fa.loss_pct, fa.remaining, fa.initial_objects)
+
+    print("Creating visualizations...")
+    plot_complete_fate_analysis(fa, filepath, full_resolution=full_resolution, dpi=dpi)
+    plot_loss_analysis(fa.times, fa.lost, fa.loss_pct, fa.remaining, fa.initial_objects,
+                       filepath, full_resolution=full_resolution, dpi=dpi)
+    return True
+
+
+def use_agg_when_headless():
+    """
+    Switch to the Agg backend when stdout is not a terminal.
+    
+    The fate and loss figures are only ever saved, so batch runs without a
+    terminal skip loading a GUI backend. An explicit MPLBACKEND is respected.
+    Called from the scripts' main(); importing this module leaves the backend
+    alone.
+    """
+    
+    if os.environ.get('MPLBACKEND') is None and not sys.stdout.isatty():
+        matplotlib.use('Agg')
+
+
+def _init_worker():
+    """Worker processes only save figures, so never start a GUI backend."""
+    matplotlib.use('Agg')
+
+
+def expand_paths(args):
+    """Expand glob patterns; plain paths are kept so missing files get reported."""
+
+    paths = []
+    for arg in args:
+        matches = sorted(glob.glob(arg))
+        paths.extend(matches if matches else [arg])
+    return paths
+
+
+def main():
+    use_agg_when_headless()
+    args, full_resolution, dpi = parse_cli_options(sys.argv[1:])
+
+    if len(args) < 1:
+        print("Usage: python analyze_snapshot.py <snapshot_file|glob> [...] [--full-resolution] [--dpi=N]")
+        print("\nExample:")
+        print("  python analyze_snapshot.py input/snaps/snaps_output_2_20260112_182628.txt")
+        print("  python analyze_snapshot.py 'input/snaps/snaps_output_*.txt'")
+        sys.exit(1)
+
+    paths = expand_paths(args)
+
+    if len(paths) == 1:
+        ok = [process_one(paths[0], full_resolution, dpi)]
+    else:
+        # Snapshot files are independent; analyze one per process
+        print(f"Analyzing {len(paths)} snapshot files in parallel...")
+        worker = partial(process_one, full_resolution=full_resolution, dpi=dpi)
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_worker) as executor:
+            ok = list(executor.map(worker, paths))
+
+    if not all(ok):
+        sys.exit(1)
+
+    print(f"\n{'='*80}")
+    print("ANALYSIS COMPLETE!")
+    print(f"{'='*80}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,40 @@ Compare metrics across multiple folders for the same parameter configuration.
 Each configuration will produce one comparison plot showing all approaches.
 """
 
+import matplotlib
+matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
+import numpy as np
 import sys
 import os
 import glob
+import re
+
+from analyze_snapshot import decimate_indices, parse_cli_options, parse_snapshot_columns_tolerant
+
+
+# time_stamp, lost objects %, tubes expired by time, tubes expired by reads,
+# wet tubes %, objects in cache %
+SNAPSHOT_USECOLS = (0, 9, 12, 13, 14, 16)
+
+# Accesses per day, from a configuration name such as 'maxReads 100, accessRate 500, Zipf'
+ACCESS_RATE_RE = re.compile(r'accessRate[_\s](\d+)')
+
+# Plot color for each approach
+FOLDER_COLORS = {
+    'triplets_clustered_random_small_cluster_expiration': 'tab:blue',
+    'triplets_copysets_expiration': 'tab:orange',
+    'triplets_random_expiration': 'tab:green',
+    'tube_replication_small_cluster_expiration': 'tab:red'
+}
+
+# Short display name for each approach
+FOLDER_SHORT_NAMES = {
+    'triplets_clustered_random_small_cluster_expiration': 'Triplets Clustered',
+    'triplets_copysets_expiration': 'Triplets Copysets',
+    'triplets_random_expiration': 'Triplets Random',
+    'tube_replication_small_cluster_expiration': 'Tube Replication'
+}
 
 
 def parse_snapshot_file(filepath, access_rate):
@@ -18,55 +48,21 @@ def parse_snapshot_file(filepath, access_rate):
         access_rate: Number of accesses per day (100 or 500)
     """
     
-    times = []
-    lost_percent = []
-    wet_tubes_pct = []
-    objects_in_cache_pct = []
-    tubes_expired_by_time = []
-    tubes_expired_by_reads = []
+    # Skip the 3 header lines; rows with fewer than the layout's 21 fields, or
+    # with fields that do not convert, are dropped
+    data = parse_snapshot_columns_tolerant(filepath, SNAPSHOT_USECOLS, skiprows=3,
+                                           min_fields=21)
     
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-        
-        # Read the header to get maximum_time_in_simulation
-        header_line = lines[1]
-        header_parts = header_line.strip().split(', ')
-        max_time_simulation = float(header_parts[2])  # maximum_time_in_simulation in days
-        
-        # Skip the first 2 header lines and the column headers (line 3)
-        for line in lines[3:]:
-            parts = line.strip().split(', ')
-            if len(parts) < 21:
-                continue
-            
-            try:
-                # time_stamp is the snapshot number representing number of accesses
-                snapshot_num = int(parts[0])
-                lost_pct = float(parts[9])
-                expired_time = int(parts[12])
-                expired_reads = int(parts[13])
-                wet_pct = float(parts[14])
-                cache_pct = float(parts[16])
-                
-                # Convert to years:
-                # Snapshots taken every 365 accesses
-                # accessRate is accesses per day
-                # So: days = accesses / accessRate
-                # And: years = days / 365
-                days = snapshot_num / float(access_rate)
-                years = days / 365.0
-                
-                times.append(years)
-                lost_percent.append(lost_pct)
-                wet_tubes_pct.append(wet_pct)
-                objects_in_cache_pct.append(cache_pct)
-                tubes_expired_by_time.append(expired_time)
-                tubes_expired_by_reads.append(expired_reads)
-            except (ValueError, IndexError) as e:
-                continue
-    
-    return (times, lost_percent, wet_tubes_pct, objects_in_cache_pct, 
-            tubes_expired_by_time, tubes_expired_by_reads)
+    # Convert to years:
+    # Snapshots taken every 365 accesses
+    # accessRate is accesses per day
+    # So: days = accesses / accessRate
+    # And: years = days / 365
+    # (time_stamp is the snapshot number representing number of accesses)
+    days = data[:, 0] / float(access_rate)
+    times = days / 365.0
+    
+    return (times, data[:, 1], data[:, 4], data[:, 5], data[:, 2], data[:, 3])
 
 
 def find_matching_files(folders, pattern):
@@ -81,29 +77,37 @@ def find_matching_files(folders, pattern):
 
 def get_short_name(folder_name):
     """Convert folder name to short display name."""
-    name_map = {
-        'triplets_clustered_random_small_cluster_expiration': 'Triplets Clustered',
-        'triplets_copysets_expiration': 'Triplets Copysets',
-        'triplets_random_expiration': 'Triplets Random',
-        'tube_replication_small_cluster_expiration': 'Tube Replication'
-    }
-    return name_map.get(folder_name, folder_name)
+    return FOLDER_SHORT_NAMES.get(folder_name, folder_name)
 
 
-def plot_folder_comparison(files_dict, config_name, output_dir):
-    """Create comparison visualization across folders for a given configuration."""
-    
-    # Colors for each approach
-    colors = {
-        'triplets_clustered_random_small_cluster_expiration': 'tab:blue',
-        'triplets_copysets_expiration': 'tab:orange',
-        'triplets_random_expiration': 'tab:green',
-        'tube_replication_small_cluster_expiration': 'tab:red'
-    }
+def get_folder_meta(folder_names):
+    """Map each folder name to its (plot color, short display name)."""
+    return {name: (FOLDER_COLORS[name], get_short_name(name)) for name in folder_names}
+
+
+def plot_folder_comparison(files_dict, config_name, output_dir, figure=None,
+                           full_resolution=False, dpi=150, folder_meta=None):
+    """Create comparison visualization across folders for a given configuration.
+    
+    figure is an optional (fig, axes) pair from plt.subplots(2, 2) with
+    constrained_layout=True; its axes are cleared and redrawn, and the figure
+    is left open for the next configuration. Without it a new figure is
+    created and closed after saving.
+    
+    Lines are drawn from at most MAX_PLOT_POINTS snapshots per approach
+    unless full_resolution is set. The PNG is written at dpi (150 by default;
+    use 300 for final figures).
+    
+    folder_meta maps folder names to (color, short name), as returned by
+    get_folder_meta; it is built from files_dict when not given.
+    """
+    
+    # Color and display name for each approach
+    if folder_meta is None:
+        folder_meta = get_folder_meta(files_dict)
     
     # Extract access rate from config name
-    import re
-    match = re.search(r'accessRate[_\s](\d+)', config_name)
+    match = ACCESS_RATE_RE.search(config_name)
     if match:
         access_rate = int(match.group(1))
     else:
@@ -115,28 +119,45 @@ def plot_folder_comparison(files_dict, config_name, output_dir):
     for folder_name, filepath in files_dict.items():
         print(f"  Reading {folder_name} (access_rate={access_rate})...")
         parsed = parse_snapshot_file(filepath, access_rate)
-        if parsed[0]:  # if we have data
+        if len(parsed[0]):  # if we have data
             data[folder_name] = parsed
     
     if not data:
         print(f"  No valid data found for {config_name}")
         return None
     
-    # Create figure with 4 subplots (2 rows, 2 columns)
-    fig = plt.figure(figsize=(16, 10))
+    # Create figure with 4 subplots (2 rows, 2 columns), or clear the reused one
+    own_figure = figure is None
+    if own_figure:
+        figure = plt.subplots(2, 2, figsize=(16, 10), constrained_layout=True)
+    fig, axes = figure
+    for ax in axes.flat:
+        ax.cla()
+    (ax1, ax2), (ax3, ax4) = axes
     
     # Overall title
     fig.suptitle(f'Approach Comparison: {config_name}', 
-                 fontsize=16, fontweight='bold', y=0.995)
+                 fontsize=16, fontweight='bold')
+    
+    # Plot a strided subset of long series; axis limits use the full data
+    plot_indices = {}
+    plotted = {}
+    for folder_name, series in data.items():
+        idx = slice(None) if full_resolution else decimate_indices(len(series[0]))
+        plot_indices[folder_name] = idx
+        plotted[folder_name] = tuple(values[idx] for values in series)
+    
+    # Total tubes expired (by time + by reads), once per approach
+    expired_total = {folder_name: exp_time + exp_reads
+                     for folder_name, (_, _, _, _, exp_time, exp_reads) in data.items()}
     
     # Find the maximum time across all datasets
-    max_time = max(max(times) for times, _, _, _, _, _ in data.values())
+    max_time = max(times.max() for times, _, _, _, _, _ in data.values())
     
     # 1. Lost Objects Percentage
-    ax1 = plt.subplot(2, 2, 1)
-    for folder_name, (times, lost_percent, _, _, _, _) in data.items():
-        ax1.plot(times, lost_percent, color=colors[folder_name], 
-                linewidth=1.2, alpha=0.9, label=get_short_name(folder_name))
+    for folder_name, (times, lost_percent, _, _, _, _) in plotted.items():
+        ax1.plot(times, lost_percent, color=folder_meta[folder_name][0], 
+                linewidth=1.2, alpha=0.9, label=folder_meta[folder_name][1], rasterized=True)
     ax1.set_xlabel('Time (years)', fontsize=12)
     ax1.set_ylabel('Lost Objects (%)', fontsize=12)
     ax1.set_title('Lost Objects Percentage Over Time', fontsize=13, fontweight='bold')
@@ -146,10 +167,9 @@ def plot_folder_comparison(files_dict, config_name, output_dir):
     ax1.set_ylim(0, 110)
     
     # 2. Wet Tubes Percentage
-    ax2 = plt.subplot(2, 2, 2)
-    for folder_name, (times, _, wet_tubes_pct, _, _, _) in data.items():
-        ax2.plot(times, wet_tubes_pct, color=colors[folder_name], 
-                linewidth=1.2, alpha=0.9, label=get_short_name(folder_name))
+    for folder_name, (times, _, wet_tubes_pct, _, _, _) in plotted.items():
+        ax2.plot(times, wet_tubes_pct, color=folder_meta[folder_name][0], 
+                linewidth=1.2, alpha=0.9, label=folder_meta[folder_name][1], rasterized=True)
     ax2.set_xlabel('Time (years)', fontsize=12)
     ax2.set_ylabel('Wet Tubes (%)', fontsize=12)
     ax2.set_title('Wet Tubes Percentage Over Time', fontsize=13, fontweight='bold')
@@ -159,10 +179,9 @@ def plot_folder_comparison(files_dict, config_name, output_dir):
     ax2.set_ylim(0, 110)
     
     # 3. Objects in Cache Percentage
-    ax3 = plt.subplot(2, 2, 3)
-    for folder_name, (times, _, _, objects_in_cache_pct, _, _) in data.items():
-        ax3.plot(times, objects_in_cache_pct, color=colors[folder_name], 
-                linewidth=1.2, alpha=0.9, label=get_short_name(folder_name))
+    for folder_name, (times, _, _, objects_in_cache_pct, _, _) in plotted.items():
+        ax3.plot(times, objects_in_cache_pct, color=folder_meta[folder_name][0], 
+                linewidth=1.2, alpha=0.9, label=folder_meta[folder_name][1], rasterized=True)
     ax3.set_xlabel('Time (years)', fontsize=12)
     ax3.set_ylabel('Objects in Cache (%)', fontsize=12)
     ax3.set_title('Objects in Cache Percentage Over Time', fontsize=13, fontweight='bold')
@@ -170,19 +189,18 @@ def plot_folder_comparison(files_dict, config_name, output_dir):
     ax3.legend(loc='best', fontsize=10)
     ax3.set_xlim(0, max_time * 1.05)
     # Find max cache value across all approaches
-    max_cache = max(max(cache_pct) for _, _, _, cache_pct, _, _ in data.values())
+    max_cache = max(cache_pct.max() for _, _, _, cache_pct, _, _ in data.values())
     ax3.set_ylim(0, max(max_cache * 1.1, 0.1))
     
     # 4. Tubes Expired (time as dashed, total as solid)
-    ax4 = plt.subplot(2, 2, 4)
-    for folder_name, (times, _, _, _, tubes_expired_by_time, tubes_expired_by_reads) in data.items():
-        tubes_expired_total = [t + r for t, r in zip(tubes_expired_by_time, tubes_expired_by_reads)]
+    for folder_name, (times, _, _, _, tubes_expired_by_time, tubes_expired_by_reads) in plotted.items():
+        tubes_expired_total = expired_total[folder_name][plot_indices[folder_name]]
         # Dashed line for time only
-        ax4.plot(times, tubes_expired_by_time, color=colors[folder_name], 
-                linewidth=1.0, linestyle='--', alpha=0.6)
+        ax4.plot(times, tubes_expired_by_time, color=folder_meta[folder_name][0], 
+                linewidth=1.0, linestyle='--', alpha=0.6, rasterized=True)
         # Solid line for total
-        ax4.plot(times, tubes_expired_total, color=colors[folder_name], 
-                linewidth=1.2, linestyle='-', alpha=0.9, label=get_short_name(folder_name))
+        ax4.plot(times, tubes_expired_total, color=folder_meta[folder_name][0], 
+                linewidth=1.2, linestyle='-', alpha=0.9, label=folder_meta[folder_name][1], rasterized=True)
     ax4.set_xlabel('Time (years)', fontsize=12)
     ax4.set_ylabel('Tubes Expired (count)', fontsize=12)
     ax4.set_title('Tubes Expired Over Time (solid=total, dashed=by time)', fontsize=13, fontweight='bold')
@@ -190,22 +208,20 @@ def plot_folder_comparison(files_dict, config_name, output_dir):
     ax4.legend(loc='best', fontsize=10)
     ax4.set_xlim(0, max_time * 1.05)
     # Find max expired value
-    max_expired = max(max([t + r for t, r in zip(exp_time, exp_reads)]) 
-                     for _, _, _, _, exp_time, exp_reads in data.values())
+    max_expired = max(total.max() for total in expired_total.values())
     if max_expired > 0:
         ax4.set_ylim(0, max_expired * 1.1)
     
-    # Adjust layout
-    plt.tight_layout(rect=[0, 0, 1, 0.99])
-    
     # Save the figure
     os.makedirs(output_dir, exist_ok=True)
     safe_config_name = config_name.replace(' ', '_').replace('/', '_')
     output_path = os.path.join(output_dir, f'comparison_{safe_config_name}.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    # Constrained layout already fits the figure, so a single render suffices
+    fig.savefig(output_path, dpi=dpi)
     print(f"  Saved: {output_path}")
     
-    plt.close()
+    if own_figure:
+        plt.close(fig)
     
     return output_path
 
@@ -236,6 +252,15 @@ def main():
     
     print(f"Comparing {len(folders)} approaches across {len(configs)} configurations...\n")
     
+    # Colors and display names are looked up once for all configurations
+    folder_meta = get_folder_meta(folders)
+    
+    # One figure is reused for every configuration
+    figure = plt.subplots(2, 2, figsize=(16, 10), constrained_layout=True)
+    
+    # Previews default to 150 DPI; pass --dpi=300 for final figures
+    _, full_resolution, dpi = parse_cli_options(sys.argv[1:])
+    
     generated_plots = []
     for pattern, display_name in configs:
         print(f"Processing: {display_name}")
@@ -245,11 +270,15 @@ def main():
             print(f"  Warning: Only found {len(files_dict)} matching files, skipping...")
             continue
         
-        output_path = plot_folder_comparison(files_dict, display_name, output_dir)
+        output_path = plot_folder_comparison(files_dict, display_name, output_dir,
+                                             figure=figure, full_resolution=full_resolution,
+                                             dpi=dpi, folder_meta=folder_meta)
         if output_path:
             generated_plots.append(output_path)
         print()
     
+    plt.close(figure[0])
+    
     print(f"✓ Complete! Generated {len(generated_plots)} comparison plots in:")
     print(f"  {output_dir}")
 
@@ -3,10 +3,16 @@
 Batch process all simulation log files to generate tube status tracking graphs.
 """
 
+import matplotlib
+matplotlib.use('Agg')  # Use non-interactive backend
 import os
-import glob
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
+
+from track_tube_status import process
 
 def find_matching_pairs(input_dir):
     """
@@ -14,18 +20,21 @@ def find_matching_pairs(input_dir):
     """
     pairs = []
     
-    # Find all log files
-    log_files = glob.glob(os.path.join(input_dir, "log_*.txt"))
+    # List the directory once; snaps files are matched against this set
+    # rather than checked with a stat per log file
+    with os.scandir(input_dir) as entries:
+        names = {entry.name for entry in entries
+                 if entry.is_file() and entry.name.endswith(".txt")}
     
-    for log_file in sorted(log_files):
+    # Find all log files
+    for basename in sorted(name for name in names if name.startswith("log_")):
         # Derive the corresponding snaps file name
-        basename = os.path.basename(log_file)
         snaps_name = basename.replace("log_", "snaps_")
-        snaps_file = os.path.join(input_dir, snaps_name)
         
         # Check if snaps file exists
-        if os.path.exists(snaps_file):
-            pairs.append((log_file, snaps_file))
+        if snaps_name in names:
+            pairs.append((os.path.join(input_dir, basename),
+                          os.path.join(input_dir, snaps_name)))
         else:
             print(f"Warning: No matching snaps file for {basename}")
     
@@ -40,6 +49,37 @@ def generate_output_name(log_file, output_dir):
     name = basename.replace("log_", "").replace(".txt", "_status.png")
     return os.path.join(output_dir, name)
 
+def is_up_to_date(output_file, log_file, snaps_file):
+    """Return True if output_file exists and is newer than both inputs."""
+    return (os.path.exists(output_file) and
+            os.path.getmtime(output_file) >= max(os.path.getmtime(log_file),
+                                                 os.path.getmtime(snaps_file)))
+
+def run_tracking_script(script, log_file, snaps_file, output_file):
+    """
+    Run the tracking script on one log/snaps pair and return the completed process.
+    
+    The script's console report is discarded rather than buffered; only
+    stderr is kept, for the error summary.
+    """
+    return subprocess.run(
+        ["python3", script, log_file, snaps_file, output_file],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        timeout=600  # 10 minute timeout per file
+    )
+
+def process_pair(log_file, snaps_file, output_file):
+    """
+    Run the tracking analysis on one pair inside a pool worker.
+    
+    The worker's console report is discarded, as it is for the subprocess
+    path; failures surface as exceptions from the returned future.
+    """
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        process(log_file, snaps_file, output_file)
+
 def main():
     input_dir = "input"
     output_dir = "output"
@@ -54,37 +94,62 @@ def main():
     # Process each pair
     success_count = 0
     error_count = 0
+    skip_count = 0
     
-    for i, (log_file, snaps_file) in enumerate(pairs, 1):
-        log_basename = os.path.basename(log_file)
-        output_file = generate_output_name(log_file, output_dir)
-        
-        print(f"\n[{i}/{len(pairs)}] Processing: {log_basename}")
-        print(f"  Output: {os.path.basename(output_file)}")
+    # Pairs whose plot is newer than both inputs are skipped unless --force
+    force = '--force' in sys.argv[1:]
+    
+    # Pairs are independent. By default each pool worker imports the
+    # tracking module once and reuses it for every pair it is given;
+    # --subprocess runs a fresh interpreter per pair, with a timeout
+    use_subprocess = '--subprocess' in sys.argv[1:]
+    if use_subprocess:
+        executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+        run_pair = partial(run_tracking_script, script)
+    else:
+        executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+        run_pair = process_pair
+    
+    with executor:
+        futures = []
+        for log_file, snaps_file in pairs:
+            output_file = generate_output_name(log_file, output_dir)
+            if not force and is_up_to_date(output_file, log_file, snaps_file):
+                futures.append(None)
+            else:
+                futures.append(executor.submit(run_pair, log_file, snaps_file, output_file))
         
-        try:
-            # Run the tracking script
-            result = subprocess.run(
-                ["python3", script, log_file, snaps_file, output_file],
-                capture_output=True,
-                text=True,
-                timeout=600  # 10 minute timeout per file
-            )
+        # Report in input order as each result becomes available
+        for i, ((log_file, snaps_file), future) in enumerate(zip(pairs, futures), 1):
+            log_basename = os.path.basename(log_file)
+            output_file = generate_output_name(log_file, output_dir)
             
-            if result.returncode == 0:
-                print(f"  ✓ Success")
-                success_count += 1
-            else:
-                print(f"  ✗ Failed with return code {result.returncode}")
-                print(f"  Error: {result.stderr[:200]}")
+            print(f"\n[{i}/{len(pairs)}] Processing: {log_basename}")
+            print(f"  Output: {os.path.basename(output_file)}")
+            
+            if future is None:
+                print(f"  - Up to date, skipped (use --force to rebuild)")
+                skip_count += 1
+                continue
+            
+            try:
+                result = future.result()
+                
+                # In-process runs return None and report failure by raising
+                if result is None or result.returncode == 0:
+                    print(f"  ✓ Success")
+                    success_count += 1
+                else:
+                    print(f"  ✗ Failed with return code {result.returncode}")
+                    print(f"  Error: {result.stderr[:200]}")
+                    error_count += 1
+            
+            except subprocess.TimeoutExpired:
+                print(f"  ✗ Timeout (exceeded 10 minutes)")
+                error_count += 1
+            except Exception as e:
+                print(f"  ✗ Error: {str(e)}")
                 error_count += 1
-        
-        except subprocess.TimeoutExpired:
-            print(f"  ✗ Timeout (exceeded 10 minutes)")
-            error_count += 1
-        except Exception as e:
-            print(f"  ✗ Error: {str(e)}")
-            error_count += 1
     
     # Summary
     print("\n" + "="*70)
@@ -93,6 +158,7 @@ def main():
     print(f"Total files: {len(pairs)}")
     print(f"Successful: {success_count}")
     print(f"Failed: {error_count}")
+    print(f"Skipped (up to date): {skip_count}")
     print("="*70)
 
 if __name__ == "__main__":
@@ -3,58 +3,70 @@
 Batch process snapshot files to visualize m_lost_percent and exhausted_tubes_pct over time.
 """
 
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import gc
+import numpy as np
 import os
-import glob
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from analyze_snapshot import (decimate_indices, load_snapshot_columns, parse_cli_options,
+                              save_palette_png)
+
+# Snapshot columns read by parse_snapshot_file: time, lost %, exhausted tubes %.
+# Only these are loaded, so rows that stop after column 13 still parse.
+SNAPSHOT_USECOLS = (0, 9, 13)
 
 
 def parse_snapshot_file(filepath):
-    """Parse a snapshot file and extract time, m_lost_percent, and exhausted_tubes_pct."""
+    """
+    Parse a snapshot file and extract time, m_lost_percent, and exhausted_tubes_pct.
     
-    times = []
-    m_lost_percents = []
-    exhausted_tubes_pcts = []
+    The columns are read by analyze_snapshot.load_snapshot_columns, which
+    other snapshot scripts share: numpy's C parser for well-formed files,
+    and a tolerant parse that skips malformed rows otherwise. With
+    SNAP_CACHE=1 the parsed columns are cached next to the file and reused
+    on later runs.
+    """
     
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-        
-        # Skip the first 2 header lines and the column headers
-        for line in lines[3:]:
-            parts = line.strip().split(', ')
-            if len(parts) < 14:
-                continue
-            
-            try:
-                time_stamp = int(parts[0])  # time in simulation units
-                m_lost_percent = float(parts[9])  # m_lost_percent
-                exhausted_tubes_pct = float(parts[13])  # exhausted_tubes_pct
-                
-                # Store raw time stamps - we'll normalize later
-                times.append(time_stamp)
-                m_lost_percents.append(m_lost_percent)
-                exhausted_tubes_pcts.append(exhausted_tubes_pct)
-            except (ValueError, IndexError):
-                continue
+    data = load_snapshot_columns(filepath, SNAPSHOT_USECOLS, skiprows=3)
+    
+    # One copy into series-major order, so each series is a contiguous array
+    times, m_lost_percents, exhausted_tubes_pcts = np.ascontiguousarray(data.T)
     
     # Normalize time to 10 years: find max time and scale to 10
-    if times:
-        max_time = max(times)
-        times = [(t / max_time) * 10.0 for t in times]
+    if len(times):
+        times = times * (10.0 / times.max())
     
     return times, m_lost_percents, exhausted_tubes_pcts
 
 
-def plot_metrics(times, m_lost_percents, exhausted_tubes_pcts, filename, output_dir):
-    """Create a dual-axis plot for the two metrics."""
+def create_figure():
+    """
+    Build the figure plot_metrics redraws for each file.
+    
+    The Figure is drawn on its own Agg canvas and never registered with
+    pyplot, so nothing accumulates across a batch and no close is needed.
     
-    fig, ax1 = plt.subplots(figsize=(14, 7))
+    Axis labels, tick styling, grid and legend are set up here once; the
+    lines start empty. Returns (fig, (ax1, ax2), lines), where ax2 is ax1's
+    twin and lines maps each series name to its Line2D.
+    """
+    
+    fig = Figure(figsize=(14, 7), constrained_layout=True)
+    FigureCanvasAgg(fig)
+    ax1 = fig.subplots()
     
     # Plot m_lost_percent on primary y-axis
     color1 = 'tab:red'
     ax1.set_xlabel('Time (years)', fontsize=12)
     ax1.set_ylabel('Lost Objects (%)', color=color1, fontsize=12)
-    line1 = ax1.plot(times, m_lost_percents, color=color1, linewidth=2, 
-                     label='Lost Objects %', marker='o', markersize=2, alpha=0.7)
+    line1, = ax1.plot([], [], color=color1, linewidth=2,
+                      label='Lost Objects %', alpha=0.7, rasterized=True)
     ax1.tick_params(axis='y', labelcolor=color1)
     ax1.grid(True, alpha=0.3)
     
@@ -62,49 +74,130 @@ def plot_metrics(times, m_lost_percents, exhausted_tubes_pcts, filename, output_
     ax2 = ax1.twinx()
     color2 = 'tab:blue'
     ax2.set_ylabel('Exhausted Tubes (%)', color=color2, fontsize=12)
-    line2 = ax2.plot(times, exhausted_tubes_pcts, color=color2, linewidth=2,
-                     label='Exhausted Tubes %', marker='s', markersize=2, alpha=0.7)
+    line2, = ax2.plot([], [], color=color2, linewidth=2,
+                      label='Exhausted Tubes %', alpha=0.7, rasterized=True)
     ax2.tick_params(axis='y', labelcolor=color2)
     
-    # Title
-    snapshot_name = os.path.basename(filename).replace('.txt', '')
-    plt.title(f'Lost Objects % and Exhausted Tubes % Over Time\n{snapshot_name}', 
-              fontsize=14, fontweight='bold', pad=20)
-    
     # Combine legends
-    lines = line1 + line2
-    labels = [l.get_label() for l in lines]
-    ax1.legend(lines, labels, loc='upper left', fontsize=10)
+    ax1.legend([line1, line2], [line1.get_label(), line2.get_label()],
+               loc='upper left', fontsize=10)
     
     # Set x-axis to show 0 to 10 years
     ax1.set_xlim(0, 10)
     
+    return fig, (ax1, ax2), {'lost': line1, 'exhausted': line2}
+
+
+def plot_metrics(times, m_lost_percents, exhausted_tubes_pcts, filename, output_dir, figure=None,
+                 full_resolution=False, dpi=150, palette=False):
+    """Create a dual-axis plot for the two metrics.
+    
+    figure is an optional (fig, axes, lines) triple from create_figure();
+    only its line data, y limits and title are updated, and the figure is
+    left open for the next file. Without it a figure is built for this call
+    only.
+    
+    Lines are drawn from at most MAX_PLOT_POINTS snapshots unless
+    full_resolution is set. The PNG is written at dpi (150 by default;
+    use 300 for final figures) with fast, light zlib compression; with
+    palette set it is saved as a smaller 8-bit palette PNG instead.
+    """
+    
+    if figure is None:
+        fig, (ax1, ax2), lines = create_figure()
+    else:
+        fig, (ax1, ax2), lines = figure
+    
+    # Plot a strided subset of long series; axis limits use the full data
+    idx = slice(None) if full_resolution else decimate_indices(len(times))
+    lines['lost'].set_data(times[idx], m_lost_percents[idx])
+    lines['exhausted'].set_data(times[idx], exhausted_tubes_pcts[idx])
+    
+    # Title
+    snapshot_name = os.path.basename(filename).replace('.txt', '')
+    ax2.set_title(f'Lost Objects % and Exhausted Tubes % Over Time\n{snapshot_name}', 
+                  fontsize=14, fontweight='bold', pad=20)
+    
     # Set both y-axes to start at 0
-    max_lost = max(m_lost_percents) if m_lost_percents else 1
-    max_exhausted = max(exhausted_tubes_pcts) if exhausted_tubes_pcts else 1
+    max_lost = m_lost_percents.max() if len(m_lost_percents) else 1
+    max_exhausted = exhausted_tubes_pcts.max() if len(exhausted_tubes_pcts) else 1
     ax1.set_ylim(0, max_lost * 1.1)  # Add 10% padding at top
     ax2.set_ylim(0, max_exhausted * 1.1)  # Add 10% padding at top
     
-    # Adjust layout
-    fig.tight_layout()
-    
     # Save the figure
     output_path = os.path.join(output_dir, f'{snapshot_name}_metrics.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close(fig)  # Close the figure to free memory
+    if palette:
+        save_palette_png(fig, output_path, dpi=dpi)
+    else:
+        fig.savefig(output_path, dpi=dpi, pil_kwargs={'compress_level': 1})
     
     return output_path
 
 
-def process_directory(input_dir, output_dir):
+# Figure reused by every file a worker process plots (set up by _init_worker)
+_worker_figure = None
+
+# Automatic gc is off in workers; process_file collects every GC_EVERY files
+GC_EVERY = 50
+_worker_files = 0
+
+
+def _init_worker():
+    """
+    Create the figure this worker process redraws for each of its files.
+    
+    Automatic garbage collection is disabled for the rest of the batch; the
+    reused figure creates little garbage, so process_file collects only
+    every GC_EVERY files instead of letting gc pass over every allocation.
+    """
+    
+    global _worker_figure
+    gc.disable()
+    _worker_figure = create_figure()
+
+
+def process_file(filepath, output_dir, full_resolution=False, dpi=150, palette=False):
+    """Parse and plot one snapshot file; returns (success, report lines)."""
+    
+    global _worker_files
+    _worker_files += 1
+    if _worker_files % GC_EVERY == 0:
+        gc.collect()
+    
+    filename = os.path.basename(filepath)
+    
+    try:
+        times, m_lost_percents, exhausted_tubes_pcts = parse_snapshot_file(filepath)
+        
+        if len(times) == 0:
+            return False, [f"  ⚠ Warning: No valid data found in {filename}"]
+        
+        output_path = plot_metrics(times, m_lost_percents, exhausted_tubes_pcts, filepath, output_dir,
+                                   figure=_worker_figure,
+                                   full_resolution=full_resolution, dpi=dpi,
+                                   palette=palette)
+        
+        return True, [
+            f"  ✓ Saved: {os.path.basename(output_path)}",
+            f"    Data points: {len(times)}, Time range: {times[0]:.2f} to {times[-1]:.2f} years",
+            f"    Lost Objects %: {m_lost_percents.min():.4f}% to {m_lost_percents.max():.4f}%",
+            f"    Exhausted Tubes %: {exhausted_tubes_pcts.min():.2f}% to {exhausted_tubes_pcts.max():.2f}%\n",
+        ]
+    except Exception as e:
+        return False, [f"  ✗ Error processing {filename}: {str(e)}\n"]
+
+
+def process_directory(input_dir, output_dir, full_resolution=False, dpi=150, palette=False):
     """Process all .txt files in the input directory."""
     
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    # Find all .txt files in the input directory
-    pattern = os.path.join(input_dir, '*.txt')
-    files = sorted(glob.glob(pattern))
+    # Find all .txt files in the input directory (skipping hidden ones, as *.txt did)
+    with os.scandir(input_dir) as entries:
+        files = sorted(entry.path for entry in entries
+                       if entry.name.endswith('.txt') and not entry.name.startswith('.')
+                       and entry.is_file())
     
     if not files:
         print(f"No .txt files found in {input_dir}")
@@ -116,30 +209,19 @@ def process_directory(input_dir, output_dir):
     success_count = 0
     error_count = 0
     
-    for i, filepath in enumerate(files, 1):
-        filename = os.path.basename(filepath)
-        print(f"[{i}/{len(files)}] Processing: {filename}")
-        
-        try:
-            times, m_lost_percents, exhausted_tubes_pcts = parse_snapshot_file(filepath)
+    # Files are independent, so parse and plot them in parallel and report in order
+    worker = partial(process_file, output_dir=output_dir,
+                     full_resolution=full_resolution, dpi=dpi, palette=palette)
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_worker) as executor:
+        results = executor.map(worker, files)
+        for i, (filepath, (success, report)) in enumerate(zip(files, results), 1):
+            print(f"[{i}/{len(files)}] Processing: {os.path.basename(filepath)}")
+            print("\n".join(report))
             
-            if not times:
-                print(f"  ⚠ Warning: No valid data found in {filename}")
+            if success:
+                success_count += 1
+            else:
                 error_count += 1
-                continue
-            
-            output_path = plot_metrics(times, m_lost_percents, exhausted_tubes_pcts, filepath, output_dir)
-            
-            print(f"  ✓ Saved: {os.path.basename(output_path)}")
-            print(f"    Data points: {len(times)}, Time range: {times[0]:.2f} to {times[-1]:.2f} years")
-            print(f"    Lost Objects %: {min(m_lost_percents):.4f}% to {max(m_lost_percents):.4f}%")
-            print(f"    Exhausted Tubes %: {min(exhausted_tubes_pcts):.2f}% to {max(exhausted_tubes_pcts):.2f}%\n")
-            
-            success_count += 1
-            
-        except Exception as e:
-            print(f"  ✗ Error processing {filename}: {str(e)}\n")
-            error_count += 1
     
     print("=" * 70)
     print(f"Processing complete!")
@@ -150,6 +232,8 @@ def process_directory(input_dir, output_dir):
 
 
 def main():
+    _, full_resolution, dpi = parse_cli_options(sys.argv[1:])
+    
     # Define paths
     input_dir = '/Users/stephanie.schustermann/tesis/python_projects/input/snaps/clustered_random_pairwise'
     output_dir = '/Users/stephanie.schustermann/tesis/python_projects/output/snapshot_metrics/clustered_random_pairwise'
@@ -165,7 +249,8 @@ def main():
         print(f"Error: Input directory not found: {input_dir}")
         return
     
-    process_directory(input_dir, output_dir)
+    process_directory(input_dir, output_dir, full_resolution=full_resolution, dpi=dpi,
+                      palette='--palette' in sys.argv[1:])
 
 
 if __name__ == "__main__":
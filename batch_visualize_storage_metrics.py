@@ -4,71 +4,68 @@ Batch process snapshot files to visualize wet_tubes_pct, objects_in_cache_pct,
 and replica distribution (objects_2_replicas_pct, objects_1_replicas_pct, objects_0_replicas_pct).
 """
 
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+import gc
 import os
-import glob
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from analyze_snapshot import (BATCH_METRICS_USECOLS, decimate_indices, load_snapshot_columns,
+                              parse_cli_options, save_palette_png)
 
 
 def parse_snapshot_file(filepath):
-    """Parse a snapshot file and extract time and various metrics."""
+    """
+    Parse a snapshot file and extract time and various metrics.
     
-    times = []
-    wet_tubes_pct = []
-    objects_in_cache_pct = []
-    objects_2_replicas_pct = []
-    objects_1_replicas_pct = []
-    objects_0_replicas_pct = []
+    The columns are read by analyze_snapshot.load_snapshot_columns, which
+    other snapshot scripts share: numpy's C parser for well-formed files,
+    and a tolerant parse that skips malformed rows otherwise. With
+    SNAP_CACHE=1 the parsed columns are cached next to the file, so running
+    batch_visualize_complete on the same files skips the parse.
+    """
     
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-        
-        # Skip the first 2 header lines and the column headers
-        for line in lines[3:]:
-            parts = [p.strip() for p in line.split(',')]
-            # Filter out empty parts
-            parts = [p for p in parts if p]
-            
-            if len(parts) < 18:
-                continue
-            
-            try:
-                time_stamp = int(parts[0])  # time in simulation units
-                wet_tubes = float(parts[12])  # wet_tubes_pct
-                cache = float(parts[14])  # objects_in_cache_pct
-                replicas_2 = float(parts[15])  # objects_2_replicas_pct
-                replicas_1 = float(parts[16])  # objects_1_replicas_pct
-                replicas_0 = float(parts[17])  # objects_0_replicas_pct
-                
-                # Store raw time stamps - we'll normalize later
-                times.append(time_stamp)
-                wet_tubes_pct.append(wet_tubes)
-                objects_in_cache_pct.append(cache)
-                objects_2_replicas_pct.append(replicas_2)
-                objects_1_replicas_pct.append(replicas_1)
-                objects_0_replicas_pct.append(replicas_0)
-            except (ValueError, IndexError):
-                continue
+    data = load_snapshot_columns(filepath, BATCH_METRICS_USECOLS, skiprows=3)
+    
+    # One copy into series-major order, so each series is a contiguous array
+    (times, _, wet_tubes_pct, _, objects_in_cache_pct,
+     objects_2_replicas_pct, objects_1_replicas_pct, objects_0_replicas_pct) = np.ascontiguousarray(data.T)
     
     # Normalize time to 10 years: find max time and scale to 10
-    if times:
-        max_time = max(times)
-        times = [(t / max_time) * 10.0 for t in times]
+    if len(times):
+        times = times * (10.0 / times.max())
     
     return times, wet_tubes_pct, objects_in_cache_pct, objects_2_replicas_pct, objects_1_replicas_pct, objects_0_replicas_pct
 
 
-def plot_metrics(times, wet_tubes_pct, objects_in_cache_pct, objects_2_replicas_pct, 
-                 objects_1_replicas_pct, objects_0_replicas_pct, filename, output_dir):
-    """Create two subplots: one for wet_tubes vs cache, another for replica distribution."""
+def create_figure():
+    """
+    Build the figure plot_metrics redraws for each file.
     
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
+    The Figure is drawn on its own Agg canvas and never registered with
+    pyplot, so nothing accumulates across a batch and no close is needed.
+    
+    Axis labels, tick styling, grids, titles and legends are set up here
+    once; the lines start empty. Returns (fig, (ax1, ax1_twin, ax2), lines),
+    where lines maps each series name to its Line2D.
+    """
+    
+    fig = Figure(figsize=(14, 10), constrained_layout=True)
+    FigureCanvasAgg(fig)
+    ax1, ax2 = fig.subplots(2, 1)
+    lines = {}
     
     # === SUBPLOT 1: Wet Tubes vs Objects in Cache ===
     color1 = 'tab:blue'
     ax1.set_xlabel('Time (years)', fontsize=11)
     ax1.set_ylabel('Wet Tubes (%)', color=color1, fontsize=11)
-    line1 = ax1.plot(times, wet_tubes_pct, color=color1, linewidth=2, 
-                     label='Wet Tubes %', marker='o', markersize=1.5, alpha=0.7)
+    lines['wet'], = ax1.plot([], [], color=color1, linewidth=2,
+                             label='Wet Tubes %', alpha=0.7, rasterized=True)
     ax1.tick_params(axis='y', labelcolor=color1)
     ax1.grid(True, alpha=0.3)
     
@@ -76,24 +73,18 @@ def plot_metrics(times, wet_tubes_pct, objects_in_cache_pct, objects_2_replicas_
     ax1_twin = ax1.twinx()
     color2 = 'tab:orange'
     ax1_twin.set_ylabel('Objects in Cache (%)', color=color2, fontsize=11)
-    line2 = ax1_twin.plot(times, objects_in_cache_pct, color=color2, linewidth=2,
-                          label='Objects in Cache %', marker='s', markersize=1.5, alpha=0.7)
+    lines['cache'], = ax1_twin.plot([], [], color=color2, linewidth=2,
+                                    label='Objects in Cache %', alpha=0.7, rasterized=True)
     ax1_twin.tick_params(axis='y', labelcolor=color2)
     
     # Combine legends for subplot 1
-    lines1 = line1 + line2
+    lines1 = [lines['wet'], lines['cache']]
     labels1 = [l.get_label() for l in lines1]
     ax1.legend(lines1, labels1, loc='upper left', fontsize=9)
     
     # Set x-axis to 0-10 years
     ax1.set_xlim(0, 10)
     
-    # Set both y-axes to start at 0
-    max_wet = max(wet_tubes_pct) if wet_tubes_pct else 1
-    max_cache = max(objects_in_cache_pct) if objects_in_cache_pct else 1
-    ax1.set_ylim(0, max_wet * 1.1)
-    ax1_twin.set_ylim(0, max_cache * 1.1)
-    
     ax1.set_title('Wet Tubes % vs Objects in Cache %', fontsize=12, fontweight='bold', pad=10)
     
     # === SUBPLOT 2: Replica Distribution ===
@@ -101,12 +92,12 @@ def plot_metrics(times, wet_tubes_pct, objects_in_cache_pct, objects_2_replicas_
     ax2.set_ylabel('Objects (%)', fontsize=11)
     
     # Plot all three replica types
-    line3 = ax2.plot(times, objects_2_replicas_pct, color='tab:green', linewidth=2,
-                     label='2 Replicas %', marker='o', markersize=1.5, alpha=0.7)
-    line4 = ax2.plot(times, objects_1_replicas_pct, color='tab:red', linewidth=2,
-                     label='1 Replica %', marker='s', markersize=1.5, alpha=0.7)
-    line5 = ax2.plot(times, objects_0_replicas_pct, color='tab:purple', linewidth=2,
-                     label='0 Replicas %', marker='^', markersize=1.5, alpha=0.7)
+    lines['rep2'], = ax2.plot([], [], color='tab:green', linewidth=2,
+                              label='2 Replicas %', alpha=0.7, rasterized=True)
+    lines['rep1'], = ax2.plot([], [], color='tab:red', linewidth=2,
+                              label='1 Replica %', alpha=0.7, rasterized=True)
+    lines['rep0'], = ax2.plot([], [], color='tab:purple', linewidth=2,
+                              label='0 Replicas %', alpha=0.7, rasterized=True)
     
     ax2.grid(True, alpha=0.3)
     ax2.tick_params(axis='y')
@@ -117,41 +108,132 @@ def plot_metrics(times, wet_tubes_pct, objects_in_cache_pct, objects_2_replicas_
     # Set x-axis to 0-10 years
     ax2.set_xlim(0, 10)
     
+    ax2.set_title('Replica Distribution Over Time', fontsize=12, fontweight='bold', pad=10)
+    
+    return fig, (ax1, ax1_twin, ax2), lines
+
+
+def plot_metrics(times, wet_tubes_pct, objects_in_cache_pct, objects_2_replicas_pct, 
+                 objects_1_replicas_pct, objects_0_replicas_pct, filename, output_dir, figure=None,
+                 full_resolution=False, dpi=150, palette=False):
+    """Create two subplots: one for wet_tubes vs cache, another for replica distribution.
+    
+    figure is an optional (fig, axes, lines) triple from create_figure();
+    only its line data, y limits and title are updated, and the figure is
+    left open for the next file. Without it a figure is built for this call
+    only.
+    
+    Lines are drawn from at most MAX_PLOT_POINTS snapshots unless
+    full_resolution is set. The PNG is written at dpi (150 by default;
+    use 300 for final figures) with fast, light zlib compression; with
+    palette set it is saved as a smaller 8-bit palette PNG instead.
+    """
+    
+    if figure is None:
+        fig, (ax1, ax1_twin, ax2), lines = create_figure()
+    else:
+        fig, (ax1, ax1_twin, ax2), lines = figure
+    
+    # Plot a strided subset of long series; axis limits use the full data
+    idx = slice(None) if full_resolution else decimate_indices(len(times))
+    t = times[idx]
+    lines['wet'].set_data(t, wet_tubes_pct[idx])
+    lines['cache'].set_data(t, objects_in_cache_pct[idx])
+    lines['rep2'].set_data(t, objects_2_replicas_pct[idx])
+    lines['rep1'].set_data(t, objects_1_replicas_pct[idx])
+    lines['rep0'].set_data(t, objects_0_replicas_pct[idx])
+    
+    # Set both y-axes to start at 0
+    max_wet = wet_tubes_pct.max() if len(wet_tubes_pct) else 1
+    max_cache = objects_in_cache_pct.max() if len(objects_in_cache_pct) else 1
+    ax1.set_ylim(0, max_wet * 1.1)
+    ax1_twin.set_ylim(0, max_cache * 1.1)
+    
     # Set y-axis to start at 0
-    max_replicas = max(
-        max(objects_2_replicas_pct) if objects_2_replicas_pct else 0,
-        max(objects_1_replicas_pct) if objects_1_replicas_pct else 0,
-        max(objects_0_replicas_pct) if objects_0_replicas_pct else 0
-    )
+    max_replicas = np.max((objects_2_replicas_pct, objects_1_replicas_pct,
+                            objects_0_replicas_pct), initial=0)
     ax2.set_ylim(0, max(max_replicas * 1.1, 1))
     
-    ax2.set_title('Replica Distribution Over Time', fontsize=12, fontweight='bold', pad=10)
-    
     # Overall title
     snapshot_name = os.path.basename(filename).replace('.txt', '')
-    fig.suptitle(f'Storage Metrics: {snapshot_name}', 
-                 fontsize=14, fontweight='bold', y=0.995)
-    
-    # Adjust layout
-    plt.tight_layout(rect=[0, 0, 1, 0.99])
+    fig.suptitle(f'Storage Metrics: {snapshot_name}', fontsize=14, fontweight='bold')
     
     # Save the figure
     output_path = os.path.join(output_dir, f'{snapshot_name}_storage_metrics.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close(fig)  # Close the figure to free memory
+    if palette:
+        save_palette_png(fig, output_path, dpi=dpi)
+    else:
+        fig.savefig(output_path, dpi=dpi, pil_kwargs={'compress_level': 1})
     
     return output_path
 
 
-def process_directory(input_dir, output_dir):
+# Figure reused by every file a worker process plots (set up by _init_worker)
+_worker_figure = None
+
+# Automatic gc is off in workers; process_file collects every GC_EVERY files
+GC_EVERY = 50
+_worker_files = 0
+
+
+def _init_worker():
+    """
+    Create the figure this worker process redraws for each of its files.
+    
+    Automatic garbage collection is disabled for the rest of the batch; the
+    reused figure creates little garbage, so process_file collects only
+    every GC_EVERY files instead of letting gc pass over every allocation.
+    """
+    
+    global _worker_figure
+    gc.disable()
+    _worker_figure = create_figure()
+
+
+def process_file(filepath, output_dir, full_resolution=False, dpi=150, palette=False):
+    """Parse and plot one snapshot file; returns (success, report lines)."""
+    
+    global _worker_files
+    _worker_files += 1
+    if _worker_files % GC_EVERY == 0:
+        gc.collect()
+    
+    filename = os.path.basename(filepath)
+    
+    try:
+        times, wet_tubes, cache, rep2, rep1, rep0 = parse_snapshot_file(filepath)
+        
+        if len(times) == 0:
+            return False, [f"  ⚠ Warning: No valid data found in {filename}"]
+        
+        output_path = plot_metrics(times, wet_tubes, cache, rep2, rep1, rep0, 
+                                  filepath, output_dir, figure=_worker_figure,
+                                   full_resolution=full_resolution, dpi=dpi,
+                                   palette=palette)
+        
+        return True, [
+            f"  ✓ Saved: {os.path.basename(output_path)}",
+            f"    Data points: {len(times)}, Time range: {times[0]:.2f} to {times[-1]:.2f} years",
+            f"    Wet Tubes %: {wet_tubes.min():.2f}% to {wet_tubes.max():.2f}%",
+            f"    Cache %: {cache.min():.4f}% to {cache.max():.4f}%",
+            f"    2 Replicas %: {rep2.min():.2f}% to {rep2.max():.2f}%",
+            f"    0 Replicas %: {rep0.min():.2f}% to {rep0.max():.2f}%\n",
+        ]
+    except Exception as e:
+        return False, [f"  ✗ Error processing {filename}: {str(e)}\n"]
+
+
+def process_directory(input_dir, output_dir, full_resolution=False, dpi=150, palette=False):
     """Process all .txt files in the input directory."""
     
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    # Find all .txt files in the input directory
-    pattern = os.path.join(input_dir, '*.txt')
-    files = sorted(glob.glob(pattern))
+    # Find all .txt files in the input directory (skipping hidden ones, as *.txt did)
+    with os.scandir(input_dir) as entries:
+        files = sorted(entry.path for entry in entries
+                       if entry.name.endswith('.txt') and not entry.name.startswith('.')
+                       and entry.is_file())
     
     if not files:
         print(f"No .txt files found in {input_dir}")
@@ -163,33 +245,19 @@ def process_directory(input_dir, output_dir):
     success_count = 0
     error_count = 0
     
-    for i, filepath in enumerate(files, 1):
-        filename = os.path.basename(filepath)
-        print(f"[{i}/{len(files)}] Processing: {filename}")
-        
-        try:
-            times, wet_tubes, cache, rep2, rep1, rep0 = parse_snapshot_file(filepath)
+    # Files are independent, so parse and plot them in parallel and report in order
+    worker = partial(process_file, output_dir=output_dir,
+                     full_resolution=full_resolution, dpi=dpi, palette=palette)
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_worker) as executor:
+        results = executor.map(worker, files)
+        for i, (filepath, (success, report)) in enumerate(zip(files, results), 1):
+            print(f"[{i}/{len(files)}] Processing: {os.path.basename(filepath)}")
+            print("\n".join(report))
             
-            if not times:
-                print(f"  ⚠ Warning: No valid data found in {filename}")
+            if success:
+                success_count += 1
+            else:
                 error_count += 1
-                continue
-            
-            output_path = plot_metrics(times, wet_tubes, cache, rep2, rep1, rep0, 
-                                      filepath, output_dir)
-            
-            print(f"  ✓ Saved: {os.path.basename(output_path)}")
-            print(f"    Data points: {len(times)}, Time range: {times[0]:.2f} to {times[-1]:.2f} years")
-            print(f"    Wet Tubes %: {min(wet_tubes):.2f}% to {max(wet_tubes):.2f}%")
-            print(f"    Cache %: {min(cache):.4f}% to {max(cache):.4f}%")
-            print(f"    2 Replicas %: {min(rep2):.2f}% to {max(rep2):.2f}%")
-            print(f"    0 Replicas %: {min(rep0):.2f}% to {max(rep0):.2f}%\n")
-            
-            success_count += 1
-            
-        except Exception as e:
-            print(f"  ✗ Error processing {filename}: {str(e)}\n")
-            error_count += 1
     
     print("=" * 70)
     print(f"Processing complete!")
@@ -200,6 +268,8 @@ def process_directory(input_dir, output_dir):
 
 
 def main():
+    _, full_resolution, dpi = parse_cli_options(sys.argv[1:])
+    
     # Define paths
     input_dir = '/Users/stephanie.schustermann/tesis/python_projects/input/snaps/clustered_random_pairwise'
     output_dir = '/Users/stephanie.schustermann/tesis/python_projects/output/snapshot_storage_metrics/clustered_random_pairwise'
@@ -215,7 +285,8 @@ def main():
         print(f"Error: Input directory not found: {input_dir}")
         return
     
-    process_directory(input_dir, output_dir)
+    process_directory(input_dir, output_dir, full_resolution=full_resolution, dpi=dpi,
+                      palette='--palette' in sys.argv[1:])
 
 
 if __name__ == "__main__":
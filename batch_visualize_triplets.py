@@ -9,16 +9,26 @@ Graph 1: Objects in Cache + Replica Distribution (2 or 3 replicas)
 Graph 2: Wet Tubes + Lost Objects + Exhausted Tubes
 """
 
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
 import os
 import glob
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from analyze_snapshot import decimate_indices, load_snapshot_columns, parse_cli_options
 
 
 def detect_columns(filepath):
-    """Detect which column structure the file uses."""
+    """Detect which column structure the file uses from its column header line."""
     with open(filepath, 'r') as f:
-        lines = f.readlines()
-        if len(lines) < 3:
+        # Only the first three lines are needed; don't read the data rows
+        lines = [f.readline() for _ in range(3)]
+        if not lines[2]:
             return None
         
         header = lines[2].strip()
@@ -37,82 +47,36 @@ def detect_columns(filepath):
 
 
 def parse_snapshot_file(filepath):
-    """Parse a snapshot file and extract all required metrics."""
+    """
+    Parse a snapshot file and extract all required metrics.
+    
+    The columns are read by analyze_snapshot.load_snapshot_columns: numpy's
+    C parser for well-formed files, and a tolerant parse that skips
+    malformed rows otherwise. Each metric is returned as a numpy array.
+    """
     
     column_type = detect_columns(filepath)
     if column_type is None:
         return None
     
-    times = []
-    # Graph 2 metrics
-    wet_tubes_pct = []
-    m_lost_percent = []
-    exhausted_tubes_pct = []
-    # Graph 1 metrics
-    objects_in_cache_pct = []
-    objects_3_replicas_pct = []
-    objects_2_replicas_pct = []
-    objects_1_replicas_pct = []
-    objects_0_replicas_pct = []
-    
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-        
-        # Skip the first 2 header lines and the column headers
-        for line in lines[3:]:
-            parts = [p.strip() for p in line.split(',')]
-            # Filter out empty parts
-            parts = [p for p in parts if p]
-            
-            if len(parts) < 15:
-                continue
-            
-            try:
-                time_stamp = int(parts[0])  # time in simulation units
-                m_lost = float(parts[9])  # m_lost_percent
-                wet_tubes = float(parts[12])  # wet_tubes_pct
-                exhausted = float(parts[13])  # exhausted_tubes_pct
-                cache = float(parts[14])  # objects_in_cache_pct
-                
-                # Store raw time stamps - we'll normalize later
-                times.append(time_stamp)
-                wet_tubes_pct.append(wet_tubes)
-                m_lost_percent.append(m_lost)
-                exhausted_tubes_pct.append(exhausted)
-                objects_in_cache_pct.append(cache)
-                
-                # Parse replica columns based on type
-                if column_type == 'triplets':
-                    # objects_3_replicas_pct, objects_2_replicas_pct, objects_1_replicas_pct, objects_0_replicas_pct
-                    replicas_3 = float(parts[15])
-                    replicas_2 = float(parts[16])
-                    replicas_1 = float(parts[17])
-                    replicas_0 = float(parts[18])
-                elif column_type == 'copysets':
-                    # copysets_3_active_pct, copysets_2_active_pct, copysets_1_active_pct, copysets_0_active_pct
-                    replicas_3 = float(parts[15])
-                    replicas_2 = float(parts[16])
-                    replicas_1 = float(parts[17])
-                    replicas_0 = float(parts[18])
-                else:  # pairwise (max 2 replicas)
-                    # objects_2_replicas_pct, objects_1_replicas_pct, objects_0_replicas_pct
-                    replicas_3 = 0.0  # No 3-replica data
-                    replicas_2 = float(parts[15])
-                    replicas_1 = float(parts[16])
-                    replicas_0 = float(parts[17])
-                
-                objects_3_replicas_pct.append(replicas_3)
-                objects_2_replicas_pct.append(replicas_2)
-                objects_1_replicas_pct.append(replicas_1)
-                objects_0_replicas_pct.append(replicas_0)
-                
-            except (ValueError, IndexError) as e:
-                continue
+    # Columns: time, lost %, wet tubes %, exhausted tubes %, cache %, then
+    # the replica (or active copyset) columns for this file type
+    if column_type in ('triplets', 'copysets'):
+        # 3/2/1/0 replicas (or active copysets)
+        data = load_snapshot_columns(filepath, (0, 9, 12, 13, 14, 15, 16, 17, 18), skiprows=3)
+        (times, m_lost_percent, wet_tubes_pct, exhausted_tubes_pct, objects_in_cache_pct,
+         objects_3_replicas_pct, objects_2_replicas_pct, objects_1_replicas_pct,
+         objects_0_replicas_pct) = np.ascontiguousarray(data.T)
+    else:  # pairwise (max 2 replicas)
+        data = load_snapshot_columns(filepath, (0, 9, 12, 13, 14, 15, 16, 17), skiprows=3)
+        (times, m_lost_percent, wet_tubes_pct, exhausted_tubes_pct, objects_in_cache_pct,
+         objects_2_replicas_pct, objects_1_replicas_pct,
+         objects_0_replicas_pct) = np.ascontiguousarray(data.T)
+        objects_3_replicas_pct = np.zeros_like(times)  # No 3-replica data
     
     # Normalize time to 10 years: find max time and scale to 10
-    if times:
-        max_time = max(times)
-        times = [(t / max_time) * 10.0 for t in times]
+    if len(times):
+        times = times * (10.0 / times.max())
     
     return {
         'times': times,
@@ -128,21 +92,23 @@ def parse_snapshot_file(filepath):
     }
 
 
-def plot_metrics(data, filename, output_dir):
-    """Create two subplots with reorganized metrics."""
+def create_figure(column_type):
+    """
+    Build the figure plot_metrics redraws for each file of one column type.
     
-    times = data['times']
-    wet_tubes_pct = data['wet_tubes_pct']
-    m_lost_percent = data['m_lost_percent']
-    exhausted_tubes_pct = data['exhausted_tubes_pct']
-    objects_in_cache_pct = data['objects_in_cache_pct']
-    objects_3_replicas_pct = data['objects_3_replicas_pct']
-    objects_2_replicas_pct = data['objects_2_replicas_pct']
-    objects_1_replicas_pct = data['objects_1_replicas_pct']
-    objects_0_replicas_pct = data['objects_0_replicas_pct']
-    column_type = data['column_type']
+    The Figure is drawn on its own Agg canvas and never registered with
+    pyplot, so nothing accumulates across a batch and no close is needed.
+    
+    Axis labels, grids, titles and legends are set up here once; the 3-replica
+    line and the replica labels depend on column_type. The lines start empty.
+    Returns (fig, (ax1, ax2), lines), where lines maps each series name to
+    its Line2D.
+    """
     
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
+    fig = Figure(figsize=(14, 10), constrained_layout=True)
+    FigureCanvasAgg(fig)
+    ax1, ax2 = fig.subplots(2, 1)
+    lines = {}
     
     # === SUBPLOT 1: Objects in Cache + Replica Distribution ===
     color1 = 'tab:orange'
@@ -150,49 +116,42 @@ def plot_metrics(data, filename, output_dir):
     ax1.set_ylabel('Objects (%)', fontsize=11)
     
     # Plot cache on primary axis
-    line1 = ax1.plot(times, objects_in_cache_pct, color=color1, linewidth=2.5,
-                     label='Objects in Cache %', marker='o', markersize=1.5, alpha=0.8, zorder=5)
+    lines['cache'], = ax1.plot([], [], color=color1, linewidth=2.5,
+                               label='Objects in Cache %', marker='o', markersize=1.5, alpha=0.8, zorder=5,
+                               rasterized=True)
     
     lines_replica = []
     
     # Plot replica distribution based on column type
     if column_type in ['triplets', 'copysets']:
         # Has 3 replicas
-        line_r3 = ax1.plot(times, objects_3_replicas_pct, color='tab:cyan', linewidth=2,
-                         label='3 Replicas %' if column_type == 'triplets' else '3 Active Copysets %', 
-                         marker='d', markersize=1.2, alpha=0.7)
-        lines_replica.extend(line_r3)
-    
-    line_r2 = ax1.plot(times, objects_2_replicas_pct, color='tab:green', linewidth=2,
-                     label='2 Replicas %' if column_type != 'copysets' else '2 Active Copysets %', 
-                     marker='s', markersize=1.2, alpha=0.7)
-    line_r1 = ax1.plot(times, objects_1_replicas_pct, color='tab:blue', linewidth=2,
-                     label='1 Replica %' if column_type != 'copysets' else '1 Active Copyset %', 
-                     marker='^', markersize=1.2, alpha=0.7)
-    line_r0 = ax1.plot(times, objects_0_replicas_pct, color='tab:red', linewidth=2,
-                     label='0 Replicas % (Lost)' if column_type != 'copysets' else '0 Active Copysets %', 
-                     marker='v', markersize=1.2, alpha=0.7)
-    
-    lines_replica.extend(line_r2 + line_r1 + line_r0)
+        lines['rep3'], = ax1.plot([], [], color='tab:cyan', linewidth=2,
+                                  label='3 Replicas %' if column_type == 'triplets' else '3 Active Copysets %', 
+                                  marker='d', markersize=1.2, alpha=0.7, rasterized=True)
+        lines_replica.append(lines['rep3'])
+    
+    lines['rep2'], = ax1.plot([], [], color='tab:green', linewidth=2,
+                              label='2 Replicas %' if column_type != 'copysets' else '2 Active Copysets %', 
+                              marker='s', markersize=1.2, alpha=0.7, rasterized=True)
+    lines['rep1'], = ax1.plot([], [], color='tab:blue', linewidth=2,
+                              label='1 Replica %' if column_type != 'copysets' else '1 Active Copyset %', 
+                              marker='^', markersize=1.2, alpha=0.7, rasterized=True)
+    lines['rep0'], = ax1.plot([], [], color='tab:red', linewidth=2,
+                              label='0 Replicas % (Lost)' if column_type != 'copysets' else '0 Active Copysets %', 
+                              marker='v', markersize=1.2, alpha=0.7, rasterized=True)
+    
+    lines_replica.extend([lines['rep2'], lines['rep1'], lines['rep0']])
     
     ax1.grid(True, alpha=0.3)
     ax1.tick_params(axis='y')
     
     # Legend for subplot 1
-    lines1 = line1 + lines_replica
+    lines1 = [lines['cache']] + lines_replica
     labels1 = [l.get_label() for l in lines1]
     ax1.legend(lines1, labels1, loc='best', fontsize=9, ncol=2)
     
     # Set axes
     ax1.set_xlim(0, 10)
-    max_cache = max(objects_in_cache_pct) if objects_in_cache_pct else 1
-    max_replicas = max(
-        max(objects_3_replicas_pct) if objects_3_replicas_pct else 0,
-        max(objects_2_replicas_pct) if objects_2_replicas_pct else 0,
-        max(objects_1_replicas_pct) if objects_1_replicas_pct else 0,
-        max(objects_0_replicas_pct) if objects_0_replicas_pct else 0
-    )
-    ax1.set_ylim(0, max(max_cache, max_replicas) * 1.1)
     
     ax1.set_title('Cache and Replica Distribution', fontsize=12, fontweight='bold', pad=10)
     
@@ -201,49 +160,130 @@ def plot_metrics(data, filename, output_dir):
     ax2.set_ylabel('Percentage (%)', fontsize=11)
     
     # Plot all three metrics
-    line5 = ax2.plot(times, wet_tubes_pct, color='tab:blue', linewidth=2,
-                     label='Wet Tubes %', marker='o', markersize=1.5, alpha=0.7)
-    line6 = ax2.plot(times, m_lost_percent, color='tab:red', linewidth=2,
-                     label='Lost Objects %', marker='s', markersize=1.5, alpha=0.7)
-    line7 = ax2.plot(times, exhausted_tubes_pct, color='tab:purple', linewidth=2,
-                     label='Exhausted Tubes %', marker='^', markersize=1.5, alpha=0.7)
+    lines['wet'], = ax2.plot([], [], color='tab:blue', linewidth=2,
+                             label='Wet Tubes %', marker='o', markersize=1.5, alpha=0.7, rasterized=True)
+    lines['lost'], = ax2.plot([], [], color='tab:red', linewidth=2,
+                              label='Lost Objects %', marker='s', markersize=1.5, alpha=0.7, rasterized=True)
+    lines['exhausted'], = ax2.plot([], [], color='tab:purple', linewidth=2,
+                                   label='Exhausted Tubes %', marker='^', markersize=1.5, alpha=0.7, rasterized=True)
     
     ax2.grid(True, alpha=0.3)
     ax2.tick_params(axis='y')
     
     # Legend for subplot 2
-    lines2 = line5 + line6 + line7
+    lines2 = [lines['wet'], lines['lost'], lines['exhausted']]
     labels2 = [l.get_label() for l in lines2]
     ax2.legend(lines2, labels2, loc='best', fontsize=9)
     
     # Set axes
     ax2.set_xlim(0, 10)
-    max_tubes = max(
-        max(wet_tubes_pct) if wet_tubes_pct else 0,
-        max(m_lost_percent) if m_lost_percent else 0,
-        max(exhausted_tubes_pct) if exhausted_tubes_pct else 0
-    )
-    ax2.set_ylim(0, max(max_tubes * 1.1, 1))
     
     ax2.set_title('Wet Tubes, Lost Objects, and Exhausted Tubes', fontsize=12, fontweight='bold', pad=10)
     
+    return fig, (ax1, ax2), lines
+
+
+def plot_metrics(data, filename, output_dir, figure=None, full_resolution=False, dpi=150):
+    """Create two subplots with reorganized metrics.
+    
+    figure is an optional (fig, axes, lines) triple from create_figure()
+    for data's column type; only its line data, y limits and title are
+    updated, and the figure is left open for the next file. Without it a
+    figure is built for this call only.
+    
+    Lines are drawn from at most MAX_PLOT_POINTS snapshots unless
+    full_resolution is set. The PNG is written at dpi (150 by default;
+    use 300 for final figures).
+    """
+    
+    times = data['times']
+    wet_tubes_pct = data['wet_tubes_pct']
+    m_lost_percent = data['m_lost_percent']
+    exhausted_tubes_pct = data['exhausted_tubes_pct']
+    objects_in_cache_pct = data['objects_in_cache_pct']
+    objects_3_replicas_pct = data['objects_3_replicas_pct']
+    objects_2_replicas_pct = data['objects_2_replicas_pct']
+    objects_1_replicas_pct = data['objects_1_replicas_pct']
+    objects_0_replicas_pct = data['objects_0_replicas_pct']
+    
+    if figure is None:
+        fig, (ax1, ax2), lines = create_figure(data['column_type'])
+    else:
+        fig, (ax1, ax2), lines = figure
+    
+    # Plot a strided subset of long series; axis limits use the full data
+    idx = slice(None) if full_resolution else decimate_indices(len(times))
+    t = times[idx]
+    lines['cache'].set_data(t, objects_in_cache_pct[idx])
+    if 'rep3' in lines:
+        lines['rep3'].set_data(t, objects_3_replicas_pct[idx])
+    lines['rep2'].set_data(t, objects_2_replicas_pct[idx])
+    lines['rep1'].set_data(t, objects_1_replicas_pct[idx])
+    lines['rep0'].set_data(t, objects_0_replicas_pct[idx])
+    lines['wet'].set_data(t, wet_tubes_pct[idx])
+    lines['lost'].set_data(t, m_lost_percent[idx])
+    lines['exhausted'].set_data(t, exhausted_tubes_pct[idx])
+    
+    # Set axes
+    max_cache = objects_in_cache_pct.max() if len(objects_in_cache_pct) else 1
+    max_replicas = np.max((objects_3_replicas_pct, objects_2_replicas_pct,
+                            objects_1_replicas_pct, objects_0_replicas_pct), initial=0)
+    ax1.set_ylim(0, max(max_cache, max_replicas) * 1.1)
+    
+    max_tubes = np.max((wet_tubes_pct, m_lost_percent,
+                         exhausted_tubes_pct), initial=0)
+    ax2.set_ylim(0, max(max_tubes * 1.1, 1))
+    
     # Overall title
     snapshot_name = os.path.basename(filename).replace('.txt', '')
-    fig.suptitle(f'{snapshot_name}', 
-                 fontsize=14, fontweight='bold', y=0.995)
-    
-    # Adjust layout
-    plt.tight_layout(rect=[0, 0, 1, 0.99])
+    fig.suptitle(f'{snapshot_name}', fontsize=14, fontweight='bold')
     
     # Save the figure
     output_path = os.path.join(output_dir, f'{snapshot_name}_complete_metrics.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close(fig)  # Close the figure to free memory
+    fig.savefig(output_path, dpi=dpi)
     
     return output_path
 
 
-def process_directory(input_dir, output_dir):
+# Figures reused by every file a worker process plots, one per column type
+_worker_figures = {}
+
+
+def get_worker_figure(column_type):
+    """Return this worker process's figure for column_type, creating it on first use."""
+    
+    if column_type not in _worker_figures:
+        _worker_figures[column_type] = create_figure(column_type)
+    return _worker_figures[column_type]
+
+
+def process_file(filepath, output_dir, full_resolution=False, dpi=150):
+    """Parse and plot one snapshot file; returns (success, report lines)."""
+    
+    filename = os.path.basename(filepath)
+    
+    try:
+        data = parse_snapshot_file(filepath)
+        
+        if data is None or not len(data['times']):
+            return False, [f"  ⚠ Warning: No valid data found in {filename}"]
+        
+        output_path = plot_metrics(data, filepath, output_dir,
+                                   figure=get_worker_figure(data['column_type']),
+                                   full_resolution=full_resolution, dpi=dpi)
+        
+        return True, [
+            f"  ✓ Saved: {os.path.basename(output_path)}",
+            f"    Column type: {data['column_type']}, Data points: {len(data['times'])}, Time range: {data['times'][0]:.2f} to {data['times'][-1]:.2f} years\n",
+        ]
+    except Exception as e:
+        # Report the traceback with this file's lines; printing it here would
+        # interleave it with other files' reports
+        return False, [f"  ✗ Error processing {filename}: {str(e)}\n",
+                       traceback.format_exc().rstrip("\n")]
+
+
+def process_directory(input_dir, output_dir, full_resolution=False, dpi=150):
     """Process all .txt files in the input directory."""
     
     # Create output directory if it doesn't exist
@@ -263,30 +303,19 @@ def process_directory(input_dir, output_dir):
     success_count = 0
     error_count = 0
     
-    for i, filepath in enumerate(files, 1):
-        filename = os.path.basename(filepath)
-        print(f"[{i}/{len(files)}] Processing: {filename}")
-        
-        try:
-            data = parse_snapshot_file(filepath)
+    # Files are independent, so parse and plot them in parallel and report in order
+    worker = partial(process_file, output_dir=output_dir,
+                     full_resolution=full_resolution, dpi=dpi)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(worker, files)
+        for i, (filepath, (success, report)) in enumerate(zip(files, results), 1):
+            print(f"[{i}/{len(files)}] Processing: {os.path.basename(filepath)}")
+            print("\n".join(report))
             
-            if data is None or not data['times']:
-                print(f"  ⚠ Warning: No valid data found in {filename}")
+            if success:
+                success_count += 1
+            else:
                 error_count += 1
-                continue
-            
-            output_path = plot_metrics(data, filepath, output_dir)
-            
-            print(f"  ✓ Saved: {os.path.basename(output_path)}")
-            print(f"    Column type: {data['column_type']}, Data points: {len(data['times'])}, Time range: {data['times'][0]:.2f} to {data['times'][-1]:.2f} years\n")
-            
-            success_count += 1
-            
-        except Exception as e:
-            print(f"  ✗ Error processing {filename}: {str(e)}\n")
-            import traceback
-            traceback.print_exc()
-            error_count += 1
     
     print("=" * 70)
     print(f"Processing complete!")
@@ -299,11 +328,13 @@ def process_directory(input_dir, output_dir):
 def main():
     import sys
     
+    paths, full_resolution, dpi = parse_cli_options(sys.argv[1:])
+    
     # Check if directory argument provided
-    if len(sys.argv) > 1:
-        dir_name = sys.argv[1]
+    if paths:
+        dir_name = paths[0]
     else:
-        print("Usage: python batch_visualize_triplets.py <directory_name>")
+        print("Usage: python batch_visualize_triplets.py <directory_name> [--full-resolution] [--dpi=N]")
         print("Example: python batch_visualize_triplets.py triplets_random")
         sys.exit(1)
     
@@ -325,7 +356,7 @@ def main():
         print(f"Error: Input directory not found: {input_dir}")
         sys.exit(1)
     
-    process_directory(input_dir, output_dir)
+    process_directory(input_dir, output_dir, full_resolution=full_resolution, dpi=dpi)
 
 
 if __name__ == "__main__":
@@ -3,71 +3,80 @@ Comparison Script: Copysets vs Random
 Compares lost objects percentage over 10 years between matching file pairs.
 """
 
-import re
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 import numpy as np
 
 try:
+    import matplotlib
+    matplotlib.use('Agg')
     import matplotlib.pyplot as plt
-except ImportError:
-    print("matplotlib is required. Install it with:")
-    print("  pip3 install --user --break-system-packages matplotlib")
-    exit(1)
+except ImportError as e:
+    # Raise rather than exit, so importing this module never ends the interpreter
+    raise ImportError("matplotlib is required. Install it with:\n"
+                      "  pip3 install --user --break-system-packages matplotlib") from e
+
+from analyze_snapshot import load_snapshot_columns
 
 
 def parse_simulation_file(filepath: str) -> dict:
-    """Parse a simulation output file and extract metrics."""
-    timestamps = []
-    lost_percent = []
-    
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-    
-    for line in lines[4:]:
-        line = line.strip()
-        if not line:
-            continue
-        
-        values = [v.strip() for v in line.split(',')]
-        if len(values) >= 12:
-            try:
-                timestamps.append(float(values[0]))
-                lost_percent.append(float(values[9]))
-            except ValueError:
-                continue
+    """
+    Parse a simulation output file and extract metrics.
     
+    Timestamp and lost % columns are read by analyze_snapshot's
+    load_snapshot_columns (numpy's C parser, skipping malformed rows) and
+    returned as numpy arrays. Results are memoized per (path, modification
+    time), so a file that appears in several comparisons is read once.
+    """
+    timestamps, lost_percent = _parse_simulation_file_cached(
+        os.path.abspath(filepath), os.path.getmtime(filepath))
     return {'timestamps': timestamps, 'lost_percent': lost_percent}
 
 
-def scale_to_years(timestamps: list[float], max_years: float = 10.0) -> list[float]:
+@lru_cache(maxsize=None)
+def _parse_simulation_file_cached(filepath: str, mtime: float) -> tuple:
+    """Uncached body of parse_simulation_file; mtime is only part of the key."""
+    # Column 11 is only loaded so rows with fewer than 12 fields are skipped
+    data = load_snapshot_columns(filepath, (0, 9, 11), skiprows=4)
+    timestamps, lost_percent = np.ascontiguousarray(data[:, :2].T)
+    return timestamps, lost_percent
+
+
+def scale_to_years(timestamps: np.ndarray, max_years: float = 10.0) -> np.ndarray:
     """Scale timestamps so that max timestamp = max_years."""
-    if not timestamps or max(timestamps) == 0:
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    max_time = timestamps.max() if len(timestamps) else 0
+    if max_time == 0:
         return timestamps
-    scale_factor = max_years / max(timestamps)
-    return [t * scale_factor for t in timestamps]
+    return timestamps * (max_years / max_time)
 
 
-def find_key_points(years: list, values: list) -> list[tuple]:
+def find_key_points(years: np.ndarray, values: np.ndarray) -> list[tuple]:
     """Find important points in the curve."""
     key_points = []
-    values_arr = np.array(values)
-    years_arr = np.array(years)
+    # No copy when the series are already float64 arrays
+    values_arr = np.asarray(values, dtype=np.float64)
+    years_arr = np.asarray(years, dtype=np.float64)
     
     # First non-zero point
-    non_zero_idx = np.where(values_arr > 0)[0]
-    if len(non_zero_idx) > 0:
-        first_idx = non_zero_idx[0]
+    positive = values_arr > 0
+    if positive.any():
+        first_idx = positive.argmax()
         key_points.append((years_arr[first_idx], values_arr[first_idx], 'First loss'))
     
     # Maximum point
-    if max(values) > 0:
-        max_idx = np.argmax(values_arr)
+    max_idx = values_arr.argmax()
+    if values_arr[max_idx] > 0:
         key_points.append((years_arr[max_idx], values_arr[max_idx], 'Max'))
     
     # Points where big jumps occur
-    if len(values) > 10:
+    if len(values_arr) > 10:
         diff = np.diff(values_arr)
-        avg_change = np.mean(np.abs(diff[diff != 0])) if np.any(diff != 0) else 0
+        # Magnitudes of the non-zero steps, made absolute in place
+        changes = diff[diff != 0]
+        avg_change = np.abs(changes, out=changes).mean() if len(changes) else 0
         if avg_change > 0:
             jump_threshold = avg_change * 3
             jumps = np.where(diff > jump_threshold)[0]
@@ -80,14 +89,14 @@ def find_key_points(years: list, values: list) -> list[tuple]:
                         key_points.append((years_arr[idx + 1], values_arr[idx + 1], 'Jump'))
     
     # Final value
-    if values[-1] > 0:
+    if values_arr[-1] > 0:
         key_points.append((years_arr[-1], values_arr[-1], 'Final'))
     
     return key_points
 
 
-def plot_comparison(copyset_file: str, random_file: str, output_path: str, title_suffix: str) -> None:
-    """Create a comparison plot of lost percentage for copysets vs random."""
+def plot_comparison(copyset_file: str, random_file: str, output_path: str, title_suffix: str) -> str:
+    """Create a comparison plot of lost percentage for copysets vs random; returns output_path."""
     
     copyset_data = parse_simulation_file(copyset_file)
     random_data = parse_simulation_file(random_file)
@@ -98,13 +107,17 @@ def plot_comparison(copyset_file: str, random_file: str, output_path: str, title
     copyset_lost = copyset_data['lost_percent']
     random_lost = random_data['lost_percent']
     
-    plt.figure(figsize=(14, 8))
+    # One figure per process, cleared and redrawn for every plot instead of
+    # creating and closing a figure each time
+    plt.figure('comparison', figsize=(14, 8), clear=True)
     
     # Plot both lines
     plt.plot(copyset_years, copyset_lost, linewidth=2.5, color='black', 
-             label='Copysets', marker='o', markersize=3, markevery=max(1, len(copyset_years)//30))
+             label='Copysets', marker='o', markersize=3, markevery=max(1, len(copyset_years)//30),
+             rasterized=True)
     plt.plot(random_years, random_lost, linewidth=2.5, color='#2563eb',
-             label='Random', marker='s', markersize=3, markevery=max(1, len(random_years)//30))
+             label='Random', marker='s', markersize=3, markevery=max(1, len(random_years)//30),
+             rasterized=True)
     
     # Annotate key points for copysets
     copyset_key_points = find_key_points(copyset_years, copyset_lost)
@@ -138,8 +151,8 @@ def plot_comparison(copyset_file: str, random_file: str, output_path: str, title
     
     # Stats box
     stats_text = (
-        f"Copysets: Final={copyset_lost[-1]:.2f}%, Max={max(copyset_lost):.2f}%\n"
-        f"Random:   Final={random_lost[-1]:.2f}%, Max={max(random_lost):.2f}%"
+        f"Copysets: Final={copyset_lost[-1]:.2f}%, Max={copyset_lost.max():.2f}%\n"
+        f"Random:   Final={random_lost[-1]:.2f}%, Max={random_lost.max():.2f}%"
     )
     plt.text(0.98, 0.02, stats_text, transform=plt.gca().transAxes, 
              fontsize=10, verticalalignment='bottom', horizontalalignment='right',
@@ -148,8 +161,14 @@ def plot_comparison(copyset_file: str, random_file: str, output_path: str, title
     
     plt.tight_layout()
     plt.savefig(output_path, dpi=150)
-    plt.close()
-    print(f"    Saved: {Path(output_path).name}")
+    return output_path
+
+
+def plot_pair(pair: tuple, output_folder: Path, prefix: str) -> str:
+    """Plot one (copyset_file, random_file, suffix) pair; returns the output path."""
+    copyset_file, random_file, suffix = pair
+    output_file = output_folder / f"{prefix}_{suffix}.png"
+    return plot_comparison(str(copyset_file), str(random_file), str(output_file), suffix)
 
 
 def find_matching_pairs(input_folder: Path) -> list[tuple]:
@@ -159,22 +178,25 @@ def find_matching_pairs(input_folder: Path) -> list[tuple]:
     """
     pairs = []
     
+    # List the folder once; matching below is set lookups, not a stat() per file
+    names = {p.name for p in input_folder.iterdir()}
+    
     # Pattern 1: copyset_* vs random_* (no _2)
-    copyset_files = list(input_folder.glob("copyset_*.txt"))
+    copyset_files = [input_folder / n for n in names if n.startswith("copyset_") and n.endswith(".txt")]
     for copyset_file in copyset_files:
         # Extract suffix after "copyset_"
         suffix = copyset_file.name.replace("copyset_", "")
         random_file = input_folder / f"random_{suffix}"
-        if random_file.exists():
+        if random_file.name in names:
             pairs.append((copyset_file, random_file, suffix.replace(".txt", ""), "copyset"))
     
     # Pattern 2: copysets_2_* vs random_2_*
-    copysets2_files = list(input_folder.glob("copysets_2_*.txt"))
+    copysets2_files = [input_folder / n for n in names if n.startswith("copysets_2_") and n.endswith(".txt")]
     for copyset_file in copysets2_files:
         # Extract suffix after "copysets_2_"
         suffix = copyset_file.name.replace("copysets_2_", "")
         random_file = input_folder / f"random_2_{suffix}"
-        if random_file.exists():
+        if random_file.name in names:
             pairs.append((copyset_file, random_file, suffix.replace(".txt", ""), "copysets_2"))
     
     return pairs
@@ -195,26 +217,33 @@ def main() -> None:
     print(f"Found {len(pairs)} matching pairs to compare\n")
     
     # Group by type
-    copyset_pairs = [(c, r, s) for c, r, s, t in pairs if t == "copyset"]
-    copysets2_pairs = [(c, r, s) for c, r, s, t in pairs if t == "copysets_2"]
-    
-    # Process copyset vs random pairs
-    if copyset_pairs:
-        print(f"=== Copyset vs Random ({len(copyset_pairs)} pairs) ===")
-        for copyset_file, random_file, suffix in sorted(copyset_pairs, key=lambda x: x[2]):
-            print(f"  {suffix}")
-            output_file = output_folder / f"comparison_copyset_vs_random_{suffix}.png"
-            plot_comparison(str(copyset_file), str(random_file), str(output_file), suffix)
-        print()
-    
-    # Process copysets_2 vs random_2 pairs
-    if copysets2_pairs:
-        print(f"=== Copysets_2 vs Random_2 ({len(copysets2_pairs)} pairs) ===")
-        for copyset_file, random_file, suffix in sorted(copysets2_pairs, key=lambda x: x[2]):
-            print(f"  {suffix}")
-            output_file = output_folder / f"comparison_copysets2_vs_random2_{suffix}.png"
-            plot_comparison(str(copyset_file), str(random_file), str(output_file), suffix)
-        print()
+    copyset_pairs = sorted([(c, r, s) for c, r, s, t in pairs if t == "copyset"], key=lambda x: x[2])
+    copysets2_pairs = sorted([(c, r, s) for c, r, s, t in pairs if t == "copysets_2"], key=lambda x: x[2])
+    
+    # Pairs are independent, so plot them all in parallel and report in order
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        copyset_results = executor.map(
+            partial(plot_pair, output_folder=output_folder, prefix="comparison_copyset_vs_random"),
+            copyset_pairs)
+        copysets2_results = executor.map(
+            partial(plot_pair, output_folder=output_folder, prefix="comparison_copysets2_vs_random2"),
+            copysets2_pairs)
+        
+        # Process copyset vs random pairs
+        if copyset_pairs:
+            print(f"=== Copyset vs Random ({len(copyset_pairs)} pairs) ===")
+            for (_, _, suffix), output_path in zip(copyset_pairs, copyset_results):
+                print(f"  {suffix}")
+                print(f"    Saved: {Path(output_path).name}")
+            print()
+        
+        # Process copysets_2 vs random_2 pairs
+        if copysets2_pairs:
+            print(f"=== Copysets_2 vs Random_2 ({len(copysets2_pairs)} pairs) ===")
+            for (_, _, suffix), output_path in zip(copysets2_pairs, copysets2_results):
+                print(f"  {suffix}")
+                print(f"    Saved: {Path(output_path).name}")
+            print()
     
     print(f"Done! Generated {len(pairs)} comparison graphs in output/")
 
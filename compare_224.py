@@ -4,63 +4,73 @@ Copysets_2 (black) | Copysets_224 (green) | Copysets_248 (red) | Copysets_296 (o
 All six on one graph for each configuration.
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 import numpy as np
 
 try:
+    import matplotlib
+    matplotlib.use('Agg')
     import matplotlib.pyplot as plt
-except ImportError:
-    print("matplotlib is required. Install it with:")
-    print("  pip3 install --user --break-system-packages matplotlib")
-    exit(1)
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+except ImportError as e:
+    # Raise rather than exit, so importing this module never ends the interpreter
+    raise ImportError("matplotlib is required. Install it with:\n"
+                      "  pip3 install --user --break-system-packages matplotlib") from e
+
+from analyze_snapshot import load_snapshot_columns
 
 
 def parse_simulation_file(filepath: str) -> dict:
-    """Parse a simulation output file and extract metrics."""
-    timestamps = []
-    lost_percent = []
-    
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-    
-    for line in lines[4:]:
-        line = line.strip()
-        if not line:
-            continue
-        
-        values = [v.strip() for v in line.split(',')]
-        if len(values) >= 12:
-            try:
-                timestamps.append(float(values[0]))
-                lost_percent.append(float(values[9]))
-            except ValueError:
-                continue
+    """
+    Parse a simulation output file and extract metrics.
     
+    Timestamp and lost % columns are read by analyze_snapshot's
+    load_snapshot_columns (numpy's C parser, skipping malformed rows) and
+    returned as numpy arrays. Results are memoized per (path, modification
+    time), so a file that appears in several comparisons is read once.
+    """
+    timestamps, lost_percent = _parse_simulation_file_cached(
+        os.path.abspath(filepath), os.path.getmtime(filepath))
     return {'timestamps': timestamps, 'lost_percent': lost_percent}
 
 
-def scale_to_years(timestamps: list[float], max_years: float = 10.0) -> list[float]:
+@lru_cache(maxsize=None)
+def _parse_simulation_file_cached(filepath: str, mtime: float) -> tuple:
+    """Uncached body of parse_simulation_file; mtime is only part of the key."""
+    # Column 11 is only loaded so rows with fewer than 12 fields are skipped
+    data = load_snapshot_columns(filepath, (0, 9, 11), skiprows=4)
+    timestamps, lost_percent = np.ascontiguousarray(data[:, :2].T)
+    return timestamps, lost_percent
+
+
+def scale_to_years(timestamps: np.ndarray, max_years: float = 10.0) -> np.ndarray:
     """Scale timestamps so that max timestamp = max_years."""
-    if not timestamps or max(timestamps) == 0:
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    max_time = timestamps.max() if len(timestamps) else 0
+    if max_time == 0:
         return timestamps
-    scale_factor = max_years / max(timestamps)
-    return [t * scale_factor for t in timestamps]
+    return timestamps * (max_years / max_time)
 
 
-def find_key_points(years: list, values: list, max_points: int = 2) -> list[tuple]:
+def find_key_points(years: np.ndarray, values: np.ndarray, max_points: int = 2) -> list[tuple]:
     """Find important points in the curve (limited to avoid clutter)."""
     key_points = []
-    values_arr = np.array(values)
-    years_arr = np.array(years)
+    # No copy when the series are already float64 arrays
+    values_arr = np.asarray(values, dtype=np.float64)
+    years_arr = np.asarray(years, dtype=np.float64)
     
     # First non-zero point
-    non_zero_idx = np.where(values_arr > 0)[0]
-    if len(non_zero_idx) > 0:
-        first_idx = non_zero_idx[0]
+    positive = values_arr > 0
+    if positive.any():
+        first_idx = positive.argmax()
         key_points.append((years_arr[first_idx], values_arr[first_idx], 'Start'))
     
     # Final value
-    if values[-1] > 0:
+    if values_arr[-1] > 0:
         key_points.append((years_arr[-1], values_arr[-1], 'Final'))
     
     return key_points[:max_points]
@@ -69,8 +79,8 @@ def find_key_points(years: list, values: list, max_points: int = 2) -> list[tupl
 def plot_six_comparison(copysets2_file: str, copysets224_file: str, 
                         copysets248_file: str, copysets296_file: str,
                         copysets2384_file: str, random2_file: str,
-                        output_path: str, title_suffix: str) -> None:
-    """Create a 6-way comparison plot."""
+                        output_path: str, title_suffix: str) -> str:
+    """Create a 6-way comparison plot; returns output_path."""
     
     # Parse all six files
     data_2 = parse_simulation_file(copysets2_file)
@@ -94,29 +104,33 @@ def plot_six_comparison(copysets2_file: str, copysets224_file: str,
     lost_2384 = data_2384['lost_percent']
     lost_r2 = data_r2['lost_percent']
     
-    plt.figure(figsize=(15, 9))
-    
-    # Plot all six lines
-    plt.plot(years_2, lost_2, linewidth=2.5, color='black', 
-             label='Copysets_2', marker='o', markersize=3, markevery=max(1, len(years_2)//30))
-    plt.plot(years_224, lost_224, linewidth=2.5, color='#16a34a',
-             label='Copysets_224', marker='s', markersize=3, markevery=max(1, len(years_224)//30))
-    plt.plot(years_248, lost_248, linewidth=2.5, color='#dc2626',
-             label='Copysets_248', marker='D', markersize=3, markevery=max(1, len(years_248)//30))
-    plt.plot(years_296, lost_296, linewidth=2.5, color='#f97316',
-             label='Copysets_296', marker='v', markersize=3, markevery=max(1, len(years_296)//30))
-    plt.plot(years_2384, lost_2384, linewidth=2.5, color='#eab308',
-             label='Copysets_2384', marker='p', markersize=3, markevery=max(1, len(years_2384)//30))
-    plt.plot(years_r2, lost_r2, linewidth=2.5, color='#2563eb',
-             label='Random_2', marker='^', markersize=3, markevery=max(1, len(years_r2)//30))
+    # One figure per process, cleared and redrawn for every plot instead of
+    # creating and closing a figure each time
+    plt.figure('6way_comparison', figsize=(15, 9), clear=True)
     
-    # Annotate key points for each (limited to avoid clutter)
-    offset_y = [12, -4, -8, -12, -16, 16]
     colors = ['black', '#16a34a', '#dc2626', '#f97316', '#eab308', '#2563eb']
+    markers = ['o', 's', 'D', 'v', 'p', '^']
     data_sets = [(years_2, lost_2), (years_224, lost_224), (years_248, lost_248), 
                  (years_296, lost_296), (years_2384, lost_2384), (years_r2, lost_r2)]
     labels = ['Copysets_2', 'Copysets_224', 'Copysets_248', 'Copysets_296', 'Copysets_2384', 'Random_2']
     
+    # Plot all six lines as one LineCollection (one artist, one draw call)
+    ax = plt.gca()
+    ax.add_collection(LineCollection([np.column_stack([years, lost]) for years, lost in data_sets],
+                                     colors=colors, linewidths=2.5, rasterized=True))
+    
+    # Markers on every ~30th point, and proxy handles for the legend
+    handles = []
+    for (years, lost), color, marker, label in zip(data_sets, colors, markers, labels):
+        step = max(1, len(years) // 30)
+        ax.plot(years[::step], lost[::step], linestyle='none', color=color,
+                marker=marker, markersize=3, rasterized=True)
+        handles.append(Line2D([], [], linewidth=2.5, color=color, marker=marker,
+                              markersize=3, label=label))
+    
+    # Annotate key points for each (limited to avoid clutter)
+    offset_y = [12, -4, -8, -12, -16, 16]
+    
     for i, ((years, lost), color, label) in enumerate(zip(data_sets, colors, labels)):
         key_points = find_key_points(years, lost)
         for x, y, pt_label in key_points:
@@ -131,7 +145,7 @@ def plot_six_comparison(copysets2_file: str, copysets224_file: str,
     plt.ylabel('Lost Objects (%)', fontsize=12)
     plt.title(f'Lost Objects Percentage: 6-Way Comparison\n({title_suffix})', 
               fontsize=14, fontweight='bold')
-    plt.legend(loc='upper left', fontsize=9)
+    plt.legend(handles=handles, loc='upper left', fontsize=9)
     plt.grid(True, alpha=0.3)
     plt.xlim(0, 10)
     plt.ylim(0, 105)
@@ -139,12 +153,12 @@ def plot_six_comparison(copysets2_file: str, copysets224_file: str,
     
     # Stats box
     stats_text = (
-        f"Copysets_2:    Final={lost_2[-1]:6.2f}%, Max={max(lost_2):6.2f}%\n"
-        f"Copysets_224:  Final={lost_224[-1]:6.2f}%, Max={max(lost_224):6.2f}%\n"
-        f"Copysets_248:  Final={lost_248[-1]:6.2f}%, Max={max(lost_248):6.2f}%\n"
-        f"Copysets_296:  Final={lost_296[-1]:6.2f}%, Max={max(lost_296):6.2f}%\n"
-        f"Copysets_2384: Final={lost_2384[-1]:6.2f}%, Max={max(lost_2384):6.2f}%\n"
-        f"Random_2:      Final={lost_r2[-1]:6.2f}%, Max={max(lost_r2):6.2f}%"
+        f"Copysets_2:    Final={lost_2[-1]:6.2f}%, Max={lost_2.max():6.2f}%\n"
+        f"Copysets_224:  Final={lost_224[-1]:6.2f}%, Max={lost_224.max():6.2f}%\n"
+        f"Copysets_248:  Final={lost_248[-1]:6.2f}%, Max={lost_248.max():6.2f}%\n"
+        f"Copysets_296:  Final={lost_296[-1]:6.2f}%, Max={lost_296.max():6.2f}%\n"
+        f"Copysets_2384: Final={lost_2384[-1]:6.2f}%, Max={lost_2384.max():6.2f}%\n"
+        f"Random_2:      Final={lost_r2[-1]:6.2f}%, Max={lost_r2.max():6.2f}%"
     )
     plt.text(0.98, 0.02, stats_text, transform=plt.gca().transAxes, 
              fontsize=8, verticalalignment='bottom', horizontalalignment='right',
@@ -153,8 +167,14 @@ def plot_six_comparison(copysets2_file: str, copysets224_file: str,
     
     plt.tight_layout()
     plt.savefig(output_path, dpi=150)
-    plt.close()
-    print(f"  Saved: {Path(output_path).name}")
+    return output_path
+
+
+def plot_six_set(six_set: tuple, output_folder: Path) -> str:
+    """Plot one (six files..., suffix) tuple from find_six_sets; returns the output path."""
+    *files, suffix = six_set
+    output_file = output_folder / f"comparison_6way_{suffix}.png"
+    return plot_six_comparison(*[str(f) for f in files], str(output_file), suffix)
 
 
 def find_six_sets(input_folder: Path) -> list[tuple]:
@@ -163,7 +183,10 @@ def find_six_sets(input_folder: Path) -> list[tuple]:
     """
     six_sets = []
     
-    copysets2_files = list(input_folder.glob("copysets_2_*.txt"))
+    # List the folder once; matching below is set lookups, not a stat() per file
+    names = {p.name for p in input_folder.iterdir()}
+    
+    copysets2_files = [input_folder / n for n in names if n.startswith("copysets_2_") and n.endswith(".txt")]
     for file2 in copysets2_files:
         suffix = file2.name.replace("copysets_2_", "")
         file224 = input_folder / f"copysets_224_{suffix}"
@@ -172,7 +195,7 @@ def find_six_sets(input_folder: Path) -> list[tuple]:
         file2384 = input_folder / f"copysets_2384_{suffix}"
         file_r2 = input_folder / f"random_2_{suffix}"
         
-        if all(f.exists() for f in [file224, file248, file296, file2384, file_r2]):
+        if all(f.name in names for f in [file224, file248, file296, file2384, file_r2]):
             six_sets.append((file2, file224, file248, file296, file2384, file_r2, suffix.replace(".txt", "")))
     
     return six_sets
@@ -193,13 +216,14 @@ def main() -> None:
     print(f"Found {len(six_sets)} six sets to compare\n")
     print("=== Copysets_2 (black) | Copysets_224 (green) | Copysets_248 (red) | Copysets_296 (orange) | Copysets_2384 (yellow) | Random_2 (blue) ===\n")
     
-    for file2, file224, file248, file296, file2384, file_r2, suffix in sorted(six_sets, key=lambda x: x[6]):
-        print(f"  {suffix}")
-        output_file = output_folder / f"comparison_6way_{suffix}.png"
-        plot_six_comparison(
-            str(file2), str(file224), str(file248), str(file296), str(file2384), str(file_r2),
-            str(output_file), suffix
-        )
+    six_sets = sorted(six_sets, key=lambda x: x[6])
+    
+    # Sets are independent, so plot them in parallel and report in order
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(partial(plot_six_set, output_folder=output_folder), six_sets)
+        for six_set, output_path in zip(six_sets, results):
+            print(f"  {six_set[6]}")
+            print(f"  Saved: {Path(output_path).name}")
     
     print(f"\nDone! Generated {len(six_sets)} 6-way comparison graphs in output/")
 
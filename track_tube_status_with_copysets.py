@@ -271,6 +271,7 @@ def plot_unified_results(years_terminated, counts_terminated,
     
     fig.tight_layout()
     plt.savefig(output_filename, dpi=300, bbox_inches='tight')
+    plt.close(fig)
     print(f"\nPlot saved to: {output_filename}")
     
     # Print summary statistics
@@ -290,16 +291,8 @@ def plot_unified_results(years_terminated, counts_terminated,
     print("="*70)
 
 
-def main():
-    if len(sys.argv) < 3:
-        print("Usage: python track_tube_status_with_copysets.py <input_log_file> <input_snaps_file> [output_plot_file]")
-        print("\nExample:")
-        print("  python track_tube_status_with_copysets.py input/logs/with_copysets_track/maxReads_100_accessRate_100_dist_Uniform_20251220_204320.txt input/snaps/with_copysets_track/maxReads_100_accessRate_100_dist_Uniform_20251220_204320.txt")
-        sys.exit(1)
-    
-    log_file = sys.argv[1]
-    snaps_file = sys.argv[2]
-    output_file = sys.argv[3] if len(sys.argv) > 3 else "output/tube_status_with_copysets.png"
+def process(log_file, snaps_file, output_file):
+    """Parse one log/snaps pair and save the tube status plot to output_file."""
     
     # Parse the log file for tube terminations
     (years_terminated, counts_terminated, 
@@ -318,6 +311,20 @@ def main():
                         initial_tubes, actual_total_tubes,
                         final_terminated, synthesis_count,
                         output_file)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python track_tube_status_with_copysets.py <input_log_file> <input_snaps_file> [output_plot_file]")
+        print("\nExample:")
+        print("  python track_tube_status_with_copysets.py input/logs/with_copysets_track/maxReads_100_accessRate_100_dist_Uniform_20251220_204320.txt input/snaps/with_copysets_track/maxReads_100_accessRate_100_dist_Uniform_20251220_204320.txt")
+        sys.exit(1)
+    
+    log_file = sys.argv[1]
+    snaps_file = sys.argv[2]
+    output_file = sys.argv[3] if len(sys.argv) > 3 else "output/tube_status_with_copysets.png"
+    
+    process(log_file, snaps_file, output_file)
     
     print("\nDone!")
 